@@ -0,0 +1,247 @@
+# Attendence/cli.py
+# Headless admin commands, e.g. from cron:
+#   attendance-admin open --file morning_classes.txt
+# Only the modules a subcommand needs are imported, so class management
+# never loads Streamlit or LangChain, and only delete, export and push load pandas.
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def read_class_file(path):
+    """
+    Rows of a bulk file: one class per line as `name[,code[,daily_limit]]`.
+    Blank lines and lines starting with # are skipped; "-" reads stdin.
+    """
+    handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        rows = []
+        for row in csv.reader(handle):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            rows.append(row)
+        return rows
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def _targets(args):
+    """[(class_name, code or None, daily_limit or None)] from arguments and --file."""
+    rows = [[name] for name in args.classes]
+    if args.file:
+        rows += read_class_file(args.file)
+    targets = []
+    for row in rows:
+        code = row[1] if len(row) > 1 and row[1] else None
+        try:
+            limit = int(row[2]) if len(row) > 2 and row[2] else None
+        except ValueError:
+            raise SystemExit(f"Invalid daily limit for {row[0]}: {row[2]!r}")
+        targets.append((row[0], code, limit))
+    if not targets:
+        raise SystemExit("No classes given; pass names or --file.")
+    return targets
+
+def _run_each(targets, action, jobs):
+    """Runs action(target) -> message for every target in parallel, printing each outcome."""
+    failures = 0
+
+    def run(target):
+        try:
+            return target[0], True, action(target)
+        except Exception as e:
+            return target[0], False, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for name, ok, message in pool.map(run, targets):
+            print(f"{'ok' if ok else 'FAILED'}\t{name}\t{message}", flush=True)
+            failures += not ok
+    return 1 if failures else 0
+
+def cmd_list(args):
+    from Attendence.services import class_service
+
+    classes = class_service.get_all_classes()
+    for row in classes:
+        if args.open and not row.get("is_open"):
+            continue
+        print(f"{row['class_name']}\t{'open' if row.get('is_open') else 'closed'}\tlimit={row.get('daily_limit')}")
+    return 0
+
+def cmd_create(args):
+    from Attendence.services import class_service
+
+    def create(target):
+        name, code, limit = target
+        ok, message = class_service.create_class(
+            name, code or args.code, limit if limit is not None else args.limit
+        )
+        if not ok:
+            raise RuntimeError(message)
+        return message
+
+    return _run_each(_targets(args), create, args.jobs)
+
+def cmd_set_status(args):
+    from Attendence.services import class_service
+
+    names = [name for name, _, _ in _targets(args)]
+    known = set(class_service.get_class_names())
+    missing = [name for name in names if name not in known]
+    found = [name for name in names if name in known]
+    if found:
+        # One request for the whole batch
+        class_service.set_classes_status(found, args.command == "open")
+    state = "opened" if args.command == "open" else "closed"
+    for name in found:
+        print(f"ok\t{name}\t{state}")
+    for name in missing:
+        print(f"FAILED\t{name}\tclass not found")
+    return 1 if missing else 0
+
+def cmd_update(args):
+    from Attendence.services import class_service
+
+    def update(target):
+        name, code, limit = target
+        settings = class_service.get_class_settings(name)
+        if not settings:
+            raise RuntimeError("class not found")
+        code = code or args.code or settings["code"]
+        limit = limit if limit is not None else args.limit if args.limit is not None else settings["daily_limit"]
+        class_service.update_class_settings(name, code, limit)
+        return f"code={code} limit={limit}"
+
+    return _run_each(_targets(args), update, args.jobs)
+
+def cmd_delete(args):
+    from Attendence.services import class_service
+
+    def delete(target):
+        # Another admin may have deleted it since the names were listed
+        if not class_service.delete_class(target[0]):
+            raise RuntimeError("class not found")
+        return "deleted"
+
+    known = set(class_service.get_class_names())
+    requested = _targets(args)
+    targets = [target for target in requested if target[0] in known]
+    missing = [name for name, _, _ in requested if name not in known]
+    status = _run_each(targets, delete, args.jobs) if targets else 0
+    for name in missing:
+        print(f"FAILED\t{name}\tclass not found")
+    if missing:
+        status = 1
+    if args.no_wait:
+        return status
+    # The purge runs on daemon threads; wait so exiting does not cut it short
+    names = {name for name, _, _ in targets}
+    while True:
+        jobs = {name: job for name, job in class_service.get_purge_jobs().items() if name in names}
+        if not any(job["status"] == "running" for job in jobs.values()):
+            break
+        time.sleep(0.5)
+    for name, job in jobs.items():
+        if job["status"] == "failed":
+            print(f"FAILED\t{name}\tpurge stopped: {job['error']}")
+            status = 1
+    return status
+
+def cmd_assign(args):
+    from Attendence.services import class_service
+
+    def assign(target):
+        class_service.assign_owner(target[0], args.user)
+        return f"owned by {args.user}"
+
+    return _run_each(_targets(args), assign, args.jobs)
+
+def cmd_hash_password(args):
+    import getpass
+    from Attendence.services.auth_service import hash_password
+
+    print(hash_password(getpass.getpass("Password: ")))
+    return 0
+
+def _matrix_csv(class_name):
+    from Attendence.services import attendance_service
+
+    frame = attendance_service.query_attendance_frame(class_name)
+    return attendance_service.build_attendance_matrix(frame, attendance_service.get_roll_map(class_name)).to_csv(index=False)
+
+def cmd_export(args):
+    from Attendence.core.utils import safe_filename
+
+    os.makedirs(args.out, exist_ok=True)
+
+    def export(target):
+        path = os.path.join(args.out, f"{safe_filename(target[0])}.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(_matrix_csv(target[0]))
+        return path
+
+    return _run_each(_targets(args), export, args.jobs)
+
+def cmd_push(args):
+    from Attendence.services import github_service
+
+    def push(target):
+        ok, message = github_service.push_attendance_matrix(target[0], _matrix_csv(target[0]))
+        if not ok:
+            raise RuntimeError(message)
+        return message
+
+    return _run_each(_targets(args), push, args.jobs)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="attendance-admin", description="Headless class administration.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, handler, help_text):
+        sub = commands.add_parser(name, help=help_text)
+        sub.set_defaults(handler=handler)
+        return sub
+
+    def bulk(sub):
+        sub.add_argument("classes", nargs="*", help="class names")
+        sub.add_argument("--file", help="bulk file, one `name[,code[,daily_limit]]` per line (- for stdin)")
+        sub.add_argument("--jobs", type=int, default=8, help="classes processed at once (default: 8)")
+        return sub
+
+    sub = command("list", cmd_list, "list classes")
+    sub.add_argument("--open", action="store_true", help="only open classes")
+
+    sub = bulk(command("create", cmd_create, "create classes"))
+    sub.add_argument("--code", default="1234", help="default attendance code")
+    sub.add_argument("--limit", type=int, default=10, help="default daily limit")
+
+    sub = bulk(command("delete", cmd_delete, "delete classes and purge their data"))
+    sub.add_argument("--no-wait", action="store_true", help="do not wait for the background purge")
+
+    bulk(command("open", cmd_set_status, "open classes for attendance"))
+    bulk(command("close", cmd_set_status, "close classes"))
+
+    sub = bulk(command("update", cmd_update, "change code and/or daily limit"))
+    sub.add_argument("--code", help="new attendance code")
+    sub.add_argument("--limit", type=int, help="new daily limit")
+
+    sub = bulk(command("export", cmd_export, "write attendance matrices as CSV"))
+    sub.add_argument("--out", default=".", help="output directory (default: .)")
+
+    bulk(command("push", cmd_push, "push attendance matrices to GitHub"))
+
+    sub = bulk(command("assign", cmd_assign, "give an admin (users.id) access to classes"))
+    sub.add_argument("--user", required=True, help="users.id of the owning admin")
+
+    command("hash-password", cmd_hash_password, "print a users.password_hash value")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,21 @@
 # Attendence/components/admin_ui.py
+import io
+from urllib.parse import urlencode
 import streamlit as st
-import pandas as pd
-from Attendence.services import auth_service, class_service, attendance_service, github_service
+from Attendence.components.class_picker_ui import current_owner_id, pick_class
+from Attendence.components.matrix_ui import render_attendance_matrix, select_date_window
+from Attendence.services import auth_service, class_service, attendance_service, github_service, import_service, archive_service, journal_service
+from Attendence.core import codes
+from Attendence.core.config import get_env
 from Attendence.core.logger import get_logger
 from Attendence.core.utils import current_ist_date
 
 logger = get_logger(__name__)
 
+LIVE_REFRESH_SECONDS = 5
+LIVE_FEED_SIZE = 20
+CODE_REFRESH_SECONDS = 5
+
 def show_admin_panel():
     st.set_page_config(page_title="Admin Panel", layout="wide", page_icon="👩‍🏫")
     st.markdown("""
@@ -23,20 +32,27 @@ def show_admin_panel():
             username = st.text_input("Username")
             password = st.text_input("Password", type="password")
             if st.form_submit_button("🔐 Login"):
-                if auth_service.authenticate_admin(username, password):
+                user = auth_service.authenticate(username, password)
+                if user:
                     st.session_state.admin_logged_in = True
+                    st.session_state.admin_user = user
                     st.rerun()
                 else:
                     st.error("Invalid credentials")
         return
 
+    try:
+        class_service.resume_pending_deletions()
+    except Exception:
+        logger.warning("Could not resume pending class deletions")
+
     # Sidebar
     with st.sidebar:
         st.markdown("## ➕ Create Class")
         class_input = st.text_input("New Class Name")
         if st.button("➕ Add Class"):
             if class_input.strip():
-                success, msg = class_service.create_class(class_input)
+                success, msg = class_service.create_class(class_input, owner_id=current_owner_id())
                 if success:
                     st.success(msg)
                     st.rerun()
@@ -45,6 +61,7 @@ def show_admin_panel():
 
         if st.button("🚪 Logout"):
             st.session_state.admin_logged_in = False
+            st.session_state.admin_user = None
             st.rerun()
 
         st.markdown("## 🗑️ Delete Class")
@@ -66,8 +83,14 @@ def show_admin_panel():
             if st.button("⚠️ CONFIRM DELETE"):
                 if confirmation == "DELETE":
                     try:
-                        class_service.delete_class(delete_target)
-                        st.success(f"Class '{delete_target}' deleted.")
+                        if not class_service.owns_class(current_owner_id(), delete_target):
+                            st.error("You can only delete your own classes.")
+                            st.stop()
+                        if not class_service.delete_class(delete_target):
+                            st.error(f"Class '{delete_target}' not found.")
+                            st.session_state.confirm_delete = None
+                            st.stop()
+                        st.success(f"Class '{delete_target}' deleted. Its records are being removed in the background.")
                         st.session_state.confirm_delete = None
                         st.rerun()
                     except Exception:
@@ -78,62 +101,43 @@ def show_admin_panel():
             # Clear if user changed the input
             st.session_state.confirm_delete = None
 
-    # Class Controls
-    try:
-        classes = class_service.get_all_classes()
-    except Exception:
-        st.error("Failed to fetch classes.")
-        return
+        show_purge_status()
 
-    if not classes:
-        st.warning("No classes found.")
-        return
+    if journal_service.journal_enabled():
+        show_submission_journal()
 
-    class_names = [c["class_name"] for c in classes]
-    
-    # Persist selection across reruns
-    if "admin_selected_class" not in st.session_state:
-        st.session_state.admin_selected_class = class_names[0] if class_names else None
+    # Class Controls: one page of this admin's classes, with its settings rows
+    config = pick_class("📚 Select a Class", key="admin_class")
+    if not config:
+        return
+    selected_class_name = config["class_name"]
 
-    # Ensure selected class is still valid
-    if st.session_state.admin_selected_class not in class_names and class_names:
-        st.session_state.admin_selected_class = class_names[0]
-        
-    current_index = 0
-    if st.session_state.admin_selected_class in class_names:
-        current_index = class_names.index(st.session_state.admin_selected_class)
-
-    selected_class_name = st.selectbox(
-        "📚 Select a Class", 
-        class_names, 
-        index=current_index
-    )
-    
-    # Update state
-    st.session_state.admin_selected_class = selected_class_name
-    config = next((c for c in classes if c["class_name"] == selected_class_name), None)
-
-    st.markdown(f"**Current Code:** `{config['code']}`")
+    if codes.rotating_codes_enabled():
+        st.markdown(f"**Current Code:** rotating every {codes.CODE_WINDOW_SECONDS}s")
+    else:
+        st.markdown(f"**Current Code:** `{config['code']}`")
     st.markdown(f"**Current Limit:** `{config['daily_limit']}`")
 
     is_open = config.get("is_open", False)
-    other_open = [c["class_name"] for c in classes if c.get("is_open") and c["class_name"] != selected_class_name]
 
     st.subheader("🛠️ Attendance Controls")
     st.info(f"Status: {'OPEN' if is_open else 'CLOSED'}")
     col1, col2 = st.columns(2)
     with col1:
         if st.button("✅ Open Attendance"):
-            if other_open:
-                st.warning(f"Close other open classes: {', '.join(other_open)}")
-            else:
-                class_service.update_class_status(selected_class_name, True)
-                st.rerun()
+            class_service.update_class_status(selected_class_name, True)
+            st.rerun()
     with col2:
         if st.button("❌ Close Attendance"):
             class_service.update_class_status(selected_class_name, False)
             st.rerun()
 
+    if is_open and codes.rotating_codes_enabled():
+        show_rotating_code(selected_class_name)
+
+    if is_open and st.toggle("🔴 Live Check-in Monitor", value=True, key="live_monitor_on"):
+        show_live_monitor(selected_class_name, config["daily_limit"])
+
     with st.expander("🔄 Update Code & Limit"):
         new_code = st.text_input("New Code", value=config["code"])
         new_limit = st.number_input("New Limit", min_value=1, value=config["daily_limit"], step=1)
@@ -142,33 +146,286 @@ def show_admin_panel():
             st.success("✅ Settings updated.")
             st.rerun()
 
-    # Matrix & Push
+    show_roster_import(selected_class_name)
+    show_history_import(selected_class_name)
+    show_semester_archive(selected_class_name)
+    show_matrix_section(selected_class_name)
+
+def _owned_names():
+    """Class names the signed-in admin may see in shared panels, or None for all."""
+    owner_id = current_owner_id()
+    return None if owner_id is None else set(class_service.list_class_names(owner_id, include_deleted=True))
+
+def show_purge_status():
+    jobs = class_service.get_purge_jobs()
+    owned = _owned_names()
+    if owned is not None:
+        jobs = {name: job for name, job in jobs.items() if name in owned}
+    if not jobs:
+        return
+    st.markdown("#### 🧹 Cleanup Jobs")
+    for name, job in jobs.items():
+        removed = ", ".join(f"{count} {table}" for table, count in job["deleted"].items())
+        if job["status"] == "running":
+            st.caption(f"⏳ {name}: removed {removed} so far")
+        elif job["status"] == "done":
+            st.caption(f"✅ {name}: removed {removed}")
+        else:
+            st.caption(f"⚠️ {name}: stopped ({job['error']})")
+            if st.button("Retry", key=f"retry_purge_{name}"):
+                class_service.start_purge(name)
+                st.rerun()
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_submission_journal():
+    """
+    Check-ins acknowledged to students but not yet written to the database.
+    """
     try:
-        records = attendance_service.fetch_attendance_records(selected_class_name)
+        owned = _owned_names()
+        stats = journal_service.get_journal_stats(owned)
     except Exception:
-        st.error("Failed to fetch records.")
+        st.warning("Submission journal unavailable.")
+        return
+    pending, failed = stats.get("pending", 0), stats.get("failed", 0)
+    label = f"📮 Submission Journal: {pending} pending, {failed} failed"
+    with st.expander(label, expanded=bool(failed)):
+        if not pending and not failed:
+            st.caption("All journaled check-ins have reached the database.")
+            return
+        entries = journal_service.get_journal_entries(class_names=owned)
+        st.dataframe(
+            entries, width="stretch", hide_index=True,
+            column_order=["class_name", "roll_number", "name", "date", "status", "attempts", "last_error"],
+        )
+        if failed and st.button("🔁 Retry failed", key="journal_retry"):
+            count = journal_service.retry_failed(owned)
+            st.success(f"Requeued {count} check-in(s).")
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_monitor(class_name, daily_limit):
+    """
+    Polls today's head-only count and the new check-ins since the last tick.
+    Runs on its own timer without rerunning the rest of the page.
+    """
+    today = current_ist_date()
+    feed_key = f"live_feed_{class_name}_{today}"
+    feed = st.session_state.setdefault(feed_key, {"last_id": 0, "rows": []})
+
+    try:
+        count = attendance_service.get_daily_count(class_name, today)
+        new_rows = attendance_service.fetch_checkins_since(class_name, feed["last_id"], today, limit=LIVE_FEED_SIZE)
+    except Exception:
+        st.warning("Live monitor: failed to refresh, retrying...")
         return
 
-    if records:
-        df = pd.DataFrame(records)
-        df["status"] = "P"
-        pivot_df = df.pivot_table(index=["roll_number", "name"], columns="date", values="status", aggfunc="first", fill_value="A").reset_index()
-        pivot_df["roll_number"] = pd.to_numeric(pivot_df["roll_number"], errors="coerce")
-        pivot_df = pivot_df.dropna(subset=["roll_number"])
-        pivot_df["roll_number"] = pivot_df["roll_number"].astype(int)
-        pivot_df = pivot_df.sort_values("roll_number")
+    if new_rows:
+        feed["last_id"] = new_rows[-1]["id"]
+        feed["rows"] = (list(reversed(new_rows)) + feed["rows"])[:LIVE_FEED_SIZE]
 
-        def highlight(val):
-            return "background-color:#d4edda;color:green" if val == "P" else "background-color:#f8d7da;color:red"
+    m1, m2 = st.columns(2)
+    m1.metric("✅ Checked In Today", count)
+    m2.metric("🎟️ Remaining", max(daily_limit - count, 0))
+    if feed["rows"]:
+        st.dataframe(feed["rows"], width="stretch", hide_index=True, column_order=["roll_number", "name"])
+    else:
+        st.caption("Waiting for check-ins...")
+
+def _qr_png(data):
+    # qrcode is optional; without it only the code itself is shown
+    try:
+        import qrcode
+    except ImportError:
+        return None
+    buffer = io.BytesIO()
+    qrcode.make(data).save(buffer)
+    return buffer.getvalue()
+
+@st.fragment(run_every=CODE_REFRESH_SECONDS)
+def show_rotating_code(class_name):
+    """
+    The class's current rotating code, with a QR for students to scan.
+    When STUDENT_PORTAL_URL is set the QR opens the portal with class and code filled in.
+    """
+    code = codes.current_code(class_name)
+    portal_url = get_env("STUDENT_PORTAL_URL")
+    qr_data = f"{portal_url}?{urlencode({'class': class_name, 'code': code})}" if portal_url else code
+
+    col_code, col_qr = st.columns([2, 1])
+    with col_code:
+        st.markdown(f"<h1 style='letter-spacing: 0.3em;'>{code}</h1>", unsafe_allow_html=True)
+        st.caption(f"Changes in {codes.seconds_remaining()}s. Codes stay valid for one extra window either side.")
+    with col_qr:
+        png = _qr_png(qr_data)
+        if png:
+            st.image(png, width=180)
+        else:
+            st.caption("Install `qrcode` to show a scannable code.")
+
+@st.fragment
+def show_roster_import(class_name):
+    with st.expander("📋 Bulk Roster Import"):
+        st.caption("CSV or Excel with `roll_number` and `name` columns. Locked names are never overwritten.")
+        uploaded = st.file_uploader("Roster file", type=["csv", "xlsx"], key=f"roster_upload_{class_name}")
+        if not uploaded:
+            return
+
+        try:
+            roster_df, invalid_df, dup_df = import_service.parse_roster(import_service.read_tabular_file(uploaded))
+        except Exception as e:
+            st.error(f"Could not read roster: {e}")
+            return
+
+        st.markdown(f"**{len(roster_df)}** valid students found.")
+        if not invalid_df.empty:
+            st.warning(f"{len(invalid_df)} row(s) skipped (missing name or invalid roll number).")
+            st.dataframe(invalid_df, width="stretch")
+        if not dup_df.empty:
+            st.warning(f"{dup_df['roll_number'].nunique()} roll number(s) appear with different names in the file and were skipped.")
+            st.dataframe(dup_df, width="stretch", hide_index=True)
+
+        if roster_df.empty or not st.button("📥 Import Roster"):
+            return
+
+        bar = st.progress(0.0, text="Importing...")
+        try:
+            report = import_service.import_roster(
+                class_name,
+                roster_df,
+                progress=lambda done, total: bar.progress(done / total, text=f"Imported {done}/{total}"),
+            )
+        except Exception:
+            st.error("Import stopped partway. Re-running the import is safe.")
+            return
+        bar.progress(1.0, text="Done")
+
+        st.success(f"✅ {report['inserted']} added, {report['unchanged']} already mapped.")
+        if not report["conflicts"].empty:
+            st.error(f"{len(report['conflicts'])} roll number(s) are already locked to a different name:")
+            st.dataframe(report["conflicts"], width="stretch", hide_index=True)
+            st.download_button(
+                "⬇️ Download Conflict Report",
+                report["conflicts"].to_csv(index=False).encode(),
+                f"{class_name}_roster_conflicts.csv",
+                "text/csv",
+                on_click="ignore",
+            )
+
+@st.fragment
+def show_history_import(class_name):
+    with st.expander("🗂️ Import Historical Attendance"):
+        st.caption("The matrix CSV this page exports (roll_number, name, one P/A column per date) or a long file with roll_number, name, date.")
+        uploaded = st.file_uploader("Attendance file", type=["csv", "xlsx"], key=f"history_upload_{class_name}")
+        if not uploaded:
+            return
+
+        try:
+            long_df, invalid_df = import_service.parse_attendance_file(import_service.read_tabular_file(uploaded))
+        except Exception as e:
+            st.error(f"Could not read file: {e}")
+            return
+
+        if not invalid_df.empty:
+            st.warning(f"{len(invalid_df)} row(s) skipped (invalid roll number, name or date).")
+
+        dry_run = st.checkbox("Dry run (preview only, nothing is written)", value=True, key=f"history_dry_run_{class_name}")
+        if not st.button("🧪 Preview Import" if dry_run else "📥 Run Import"):
+            return
+
+        bar = None if dry_run else st.progress(0.0, text="Importing...")
+        try:
+            report = import_service.backfill_attendance(
+                class_name,
+                long_df,
+                dry_run=dry_run,
+                progress=(lambda done, total: bar.progress(done / total, text=f"Chunk {done}/{total}")) if bar else None,
+            )
+        except Exception:
+            st.error("Import stopped partway. Run it again with the same file to resume.")
+            return
+
+        if report["rows"]:
+            st.markdown(
+                f"**{report['rows']}** present marks for **{report['students']}** students over "
+                f"**{report['dates']}** dates ({report['first_date']} → {report['last_date']}), "
+                f"{report['new_students']} new roll number(s)."
+            )
+        if not report["conflicts"].empty:
+            st.error(f"{len(report['conflicts'])} student(s) held back: roll number locked to a different name or named inconsistently.")
+            st.dataframe(report["conflicts"], width="stretch", hide_index=True)
+
+        if not dry_run:
+            if report["skipped_chunks"]:
+                st.info(f"Resumed: {report['skipped_chunks']} chunk(s) were already imported.")
+            attendance_service.invalidate_class_data(class_name)
+            st.success("✅ Import complete.")
+
+@st.fragment
+def show_semester_archive(class_name):
+    with st.expander("🗄️ Archive Semester"):
+        if not archive_service.archiving_enabled():
+            st.info("Set ARCHIVE_BUCKET to a Supabase Storage bucket to enable archiving.")
+            return
+        try:
+            archives = archive_service.list_archives(class_name)
+        except Exception:
+            st.error("Failed to load semester archives.")
+            return
+        if archives:
+            st.dataframe(archives, width="stretch", hide_index=True, column_order=["semester", "start_date", "end_date", "rows"])
+        st.caption("Moves a closed semester's records into a compressed Parquet file in shared storage. They stay viewable through a Custom Range or All History.")
+
+        with st.form(f"archive_form_{class_name}"):
+            semester = st.text_input("Semester label", placeholder="e.g. 2025-Odd")
+            date_range = st.date_input("Semester dates", value=())
+            confirm = st.checkbox("I understand these rows will be removed from the live table")
+            submitted = st.form_submit_button("🗄️ Archive")
+
+        if not submitted:
+            return
+        if not semester.strip() or len(date_range) != 2 or not confirm:
+            st.warning("Enter a label, a start and end date, and confirm.")
+            return
+
+        bar = st.progress(0.0, text="Archiving...")
+        try:
+            report = archive_service.archive_semester(
+                class_name,
+                semester.strip(),
+                date_range[0].strftime("%Y-%m-%d"),
+                date_range[1].strftime("%Y-%m-%d"),
+                progress=lambda done, total: bar.progress(done / total, text=f"Cleaned {done}/{total} rows"),
+            )
+        except Exception:
+            st.error("Archiving stopped. Running it again with the same label is safe.")
+            return
+        bar.progress(1.0, text="Done")
+        attendance_service.invalidate_class_data(class_name)
+        st.success(f"✅ Archived {report['rows']} rows.")
+
+@st.fragment
+def show_matrix_section(class_name):
+    """
+    Matrix, export and push. Paging and window changes rerun only this fragment.
+    """
+    start_date, end_date = select_date_window(class_name, key="admin")
+    try:
+        frame = attendance_service.fetch_attendance_frame(class_name, start_date, end_date)
+        roster = attendance_service.get_roll_map(class_name)
+    except Exception:
+        st.error("Failed to fetch records.")
+        return
 
-        styled = pivot_df.style.map(highlight, subset=pivot_df.columns[2:])
-        st.dataframe(styled, width="stretch")
+    if not frame.empty:
+        st.caption(f"{len(frame):,} records loaded, {frame.memory_usage(deep=True).sum() / 1024:,.0f} KB in memory.")
+        pivot_df = attendance_service.build_attendance_matrix(frame, roster)
+        render_attendance_matrix(pivot_df, key="admin_matrix")
 
         csv_data = pivot_df.to_csv(index=False)
-        st.download_button("⬇️ Download CSV", csv_data.encode(), f"{selected_class_name}_matrix.csv", "text/csv")
+        st.download_button("⬇️ Download CSV", csv_data.encode(), f"{class_name}_matrix.csv", "text/csv", on_click="ignore")
 
         if st.button("🚀 Push to GitHub"):
-            success, msg = github_service.push_attendance_matrix(selected_class_name, csv_data)
+            success, msg = github_service.push_attendance_matrix(class_name, csv_data)
             if success:
                 st.success(msg)
             else:
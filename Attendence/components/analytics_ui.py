@@ -1,8 +1,9 @@
 # Attendence/components/analytics_ui.py
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
-from Attendence.services import class_service, attendance_service
+from Attendence.components.class_picker_ui import current_owner_id, pick_class
+from Attendence.components.matrix_ui import select_date_window
+from Attendence.services import class_service, attendance_service, analytics_service, risk_service
 from Attendence.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -10,39 +11,45 @@ logger = get_logger(__name__)
 def show_analytics_panel():
     st.subheader("📊 Attendance Analytics")
 
-    try:
-        class_list = [c["class_name"] for c in class_service.get_all_classes()]
-    except Exception:
-        st.error("Failed to fetch class list.")
+    view = st.radio("View", ["Single Class", "All Classes"], horizontal=True, key="analytics_view")
+    if view == "All Classes":
+        try:
+            class_list = class_service.list_class_names(current_owner_id())
+        except Exception:
+            st.error("Failed to fetch class list.")
+            return
+        if not class_list:
+            st.warning("No classes found.")
+            return
+        show_institution_overview(class_list)
         return
 
-    if not class_list:
-        st.warning("No classes found.")
+    config = pick_class("Select Class", key="analytics_class")
+    if not config:
         return
+    selected_class = config["class_name"]
+    show_watch_list(selected_class)
+    show_class_analytics(selected_class)
 
-    selected_class = st.selectbox("Select Class", class_list)
+@st.fragment
+def show_class_analytics(selected_class):
+    """
+    Single-class analytics. Window and range filter changes rerun only this fragment.
+    """
+    start_date, end_date = select_date_window(selected_class, key="analytics")
 
     try:
-        records = attendance_service.fetch_attendance_records(selected_class)
+        frame = attendance_service.fetch_attendance_frame(selected_class, start_date, end_date)
+        roster = attendance_service.get_roll_map(selected_class)
     except Exception:
         st.error("Failed to fetch attendance data.")
         return
 
-    if not records:
-        st.warning(f"No attendance data for class '{selected_class}'.")
+    if frame.empty:
+        st.warning(f"No attendance data for class '{selected_class}' in this window.")
         return
 
-    df = pd.DataFrame(records)
-    df["status"] = "P"
-    pivot_df = df.pivot_table(index=["roll_number", "name"], columns="date", values="status", aggfunc="first", fill_value="A").reset_index()
-    pivot_df.columns.name = None
-    
-    # Process numeric conversion if strictly needed, though analytics might just need counts.
-    # But for consistency with admin:
-    pivot_df["roll_number"] = pd.to_numeric(pivot_df["roll_number"], errors="coerce")
-    pivot_df = pivot_df.dropna(subset=["roll_number"])
-    pivot_df["roll_number"] = pivot_df["roll_number"].astype(int)
-    pivot_df = pivot_df.sort_values("roll_number")
+    pivot_df = attendance_service.build_attendance_matrix(frame, roster)
 
     st.dataframe(pivot_df, width="stretch")
 
@@ -125,3 +132,74 @@ def show_analytics_panel():
         filtered = pivot_df[(pivot_df["Attendance %"] >= selected_range[0]) & (pivot_df["Attendance %"] <= selected_range[1])]
         st.markdown(f"**{len(filtered)}** students in range:")
         st.dataframe(filtered[["name", "roll_number", "Present_Count", "Attendance %"]], width="stretch")
+
+
+@st.fragment
+def show_watch_list(selected_class):
+    """
+    Ranked at-risk students for the current term, from the incremental risk state.
+    """
+    with st.expander("🚨 At-Risk Watch List", expanded=True):
+        c1, c2 = st.columns(2)
+        threshold = c1.number_input("Threshold (%)", min_value=0.0, max_value=100.0, value=75.0, step=5.0, key="risk_threshold")
+        term_sessions = c2.number_input(
+            "Sessions in term", min_value=1, value=risk_service.DEFAULT_TERM_SESSIONS, step=1, key="risk_term_sessions"
+        )
+        try:
+            watch, sessions = risk_service.get_watch_list(selected_class, threshold, int(term_sessions))
+        except Exception:
+            st.error("Failed to compute the watch list.")
+            return
+
+        if not sessions:
+            st.info("No sessions held yet this term.")
+        elif watch.empty:
+            st.success(f"No one at risk after {sessions} session(s).")
+        else:
+            st.caption(
+                f"{len(watch)} student(s) below {threshold:.0f}%, projected to finish below it, or absent "
+                f"{risk_service.STREAK_ALERT}+ sessions in a row. Recent % covers the last "
+                f"{min(sessions, risk_service.WINDOW_SESSIONS)} sessions."
+            )
+            st.dataframe(watch, width="stretch", hide_index=True)
+
+@st.fragment
+def show_institution_overview(class_list):
+    threshold = st.number_input("At-risk threshold (%)", min_value=0.0, max_value=100.0, value=75.0, step=5.0)
+
+    with st.spinner(f"Analyzing {len(class_list)} classes..."):
+        overview, below, trend, failed = analytics_service.summarize_all_classes(class_list, threshold)
+
+    if failed:
+        st.warning(f"Could not load: {', '.join(failed)}")
+
+    if overview.empty:
+        st.warning("No attendance data in any class yet.")
+        return
+
+    total_students = int(overview["Students"].sum())
+    weighted_avg = (overview["Attendance %"] * overview["Students"]).sum() / total_students if total_students else 0.0
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("🏫 Classes", len(overview))
+    m2.metric("👥 Students", total_students)
+    m3.metric("📊 Avg Attendance", f"{weighted_avg:.2f}%")
+
+    st.divider()
+
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        st.subheader("🏫 Attendance by Class")
+        st.dataframe(overview, width="stretch", hide_index=True)
+    with c2:
+        st.subheader("📈 Daily Attendance Trend")
+        if not trend.empty:
+            st.line_chart(trend["Attendance %"], color="#4B8BBE")
+        else:
+            st.info("No data")
+
+    st.subheader(f"⚠️ Students Below {threshold:.0f}% ({len(below)})")
+    if below.empty:
+        st.success("No students below the threshold.")
+    else:
+        st.dataframe(below, width="stretch", hide_index=True)
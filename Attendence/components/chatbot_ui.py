@@ -1,95 +1,95 @@
 # Attendence/components/chatbot_ui.py
 import streamlit as st
-import pandas as pd
-from Attendence.services import chatbot_service, class_service, attendance_service
-from Attendence.services.chatbot_service import AppState
+from Attendence.components.class_picker_ui import pick_class
+from Attendence.components.matrix_ui import select_date_window
+from Attendence.services import chatbot_service, attendance_service
 
 def show_chatbot_panel():
     st.header("🤖 Chat with Attendance Data")
 
     # --- Step 1: Dropdown for Class Files from Supabase ---
+    config = pick_class("Choose a classroom", key="chatbot_class")
+
+    if config:
+        show_class_chat(config["class_name"])
+
+@st.fragment
+def show_class_chat(selected_class):
+    """
+    Chat for one class. Asking a question reruns only this fragment.
+    """
+    start_date, end_date = select_date_window(selected_class, key="chatbot")
+
+    # --- Fetch Attendance Data for Selected Class ---
     try:
-        class_names = [c["class_name"] for c in class_service.get_all_classes()]
+        frame = attendance_service.fetch_attendance_frame(selected_class, start_date, end_date)
+        roster = attendance_service.get_roll_map(selected_class)
     except Exception as e:
-        st.error(f"Failed to fetch classes: {e}")
+        st.error(f"Failed to fetch attendance records: {e}")
         return
 
-    if not class_names:
-        st.warning("No classes found.")
+    if frame.empty:
+        st.warning(f"No attendance records found for {selected_class} in this window.")
         return
 
-    selected_class = st.selectbox("Choose a classroom", class_names, key="chatbot_class_select")
-
-    if selected_class:
-        # --- Fetch Attendance Data for Selected Class ---
-        try:
-            records = attendance_service.fetch_attendance_records(selected_class)
-        except Exception as e:
-            st.error(f"Failed to fetch attendance records: {e}")
-            return
-
-        if not records:
-            st.warning(f"No attendance records found for {selected_class}.")
-            return
-
-        # --- Process Data into Pivot Table ---
-        df = pd.DataFrame(records)
-        df["status"] = "P"
-        # Pivot: Rows=Students, Cols=Dates, Value=P/A
-        pivot_df = df.pivot_table(
-            index=["roll_number", "name"], 
-            columns="date", 
-            values="status", 
-            aggfunc="first", 
-            fill_value="A"
-        ).reset_index()
+    # --- Process Data into Pivot Table ---
+    # Rows=Students (every locked roll, even with no check-in in the window), Cols=Dates, Value=P/A
+    pivot_df = attendance_service.build_attendance_matrix(frame, roster)
 
-        # Clean up roll numbers for consistent sorting/display
-        pivot_df["roll_number"] = pd.to_numeric(pivot_df["roll_number"], errors="coerce")
-        pivot_df = pivot_df.dropna(subset=["roll_number"])
-        pivot_df["roll_number"] = pivot_df["roll_number"].astype(int)
-        pivot_df = pivot_df.sort_values("roll_number")
+    st.dataframe(pivot_df, width="stretch")
 
-        st.dataframe(pivot_df, width="stretch")
+    # --- Step 2: Point the shared agent at this class ---
+    # The context is shared across sessions and keyed by the data snapshot, so
+    # a new submission gets a fresh matrix without resetting the conversation.
+    context_key = (selected_class, start_date, end_date, len(frame), int(frame["id"].max()), len(roster))
+    if not chatbot_service.has_class_context(context_key):
+        chatbot_service.prepare_class_context(context_key, pivot_df)
 
-        # --- Step 2: Setup Chatbot Agent for Selected File ---
-        if (
-            "chat_agent" not in st.session_state
-            or st.session_state.get("active_file") != selected_class
-        ):
-            st.session_state.chat_agent = chatbot_service.get_agent_for_df(pivot_df)
-            st.session_state.active_file = selected_class
-            st.session_state.chat_history = []
+    # The window is part of the key: the conversation only covers the dates shown
+    active_key = (selected_class, start_date, end_date)
+    if st.session_state.get("active_file") != active_key:
+        st.session_state.active_file = active_key
+        st.session_state.chat_history = []
+        st.session_state.chat_memory = chatbot_service.ConversationMemory()
 
-        # --- Step 3: Chat Display & Logic ---
-        # Display existing history
-        for role, message in st.session_state.chat_history:
-            # Map role to streamlit avatar/role
-            # "You" -> "user", "Bot" -> "assistant"
-            st_role = "user" if role == "You" else "assistant"
-            with st.chat_message(st_role):
-                st.markdown(message)
+    # --- Step 3: Chat Display & Logic ---
+    # Display existing history
+    for role, message, table in st.session_state.chat_history:
+        # Map role to streamlit avatar/role
+        # "You" -> "user", "Bot" -> "assistant"
+        st_role = "user" if role == "You" else "assistant"
+        with st.chat_message(st_role):
+            st.markdown(message)
+            if table is not None:
+                st.dataframe(table, width="stretch")
 
-        # Input for new question
-        if question := st.chat_input("Ask a question about this class..."):
-            # Display user message immediately
-            with st.chat_message("user"):
-                st.markdown(question)
-            
-            # Add to history
-            st.session_state.chat_history.append(("You", question))
+    # Input for new question
+    if question := st.chat_input("Ask a question about this class..."):
+        # Display user message immediately
+        with st.chat_message("user"):
+            st.markdown(question)
+        
+        # Add to history
+        st.session_state.chat_history.append(("You", question, None))
 
-            # Process with spinner
-            with st.spinner("Thinking..."):
-                try:
-                    result = st.session_state.chat_agent.invoke(AppState(question=question))
-                    answer = result["answer"]
-                except Exception as e:
-                    answer = f"❌ Error: {str(e)}"
-            
-            # Display bot response
-            with st.chat_message("assistant"):
-                st.markdown(answer)
-            
-            # Add to history
-            st.session_state.chat_history.append(("Bot", answer))
+        # Process with spinner
+        memory = st.session_state.chat_memory
+        table = None
+        with st.spinner("Thinking..."):
+            try:
+                result = chatbot_service.ask(question, context_key, memory)
+                answer = result["answer"]
+                # Large results come back as a table rather than inside the answer
+                table = result.get("table")
+                memory.add_turn(question, answer, result.get("result") if result.get("code") else None)
+            except Exception as e:
+                answer = f"❌ Error: {str(e)}"
+        
+        # Display bot response
+        with st.chat_message("assistant"):
+            st.markdown(answer)
+            if table is not None:
+                st.dataframe(table, width="stretch")
+        
+        # Add to history
+        st.session_state.chat_history.append(("Bot", answer, table))
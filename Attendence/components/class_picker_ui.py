@@ -0,0 +1,52 @@
+# Attendence/components/class_picker_ui.py
+import math
+import streamlit as st
+from Attendence.services import auth_service, class_service
+
+def current_owner_id():
+    """Owner id of the signed-in admin, or None for the super admin (every class)."""
+    return auth_service.owner_scope(st.session_state.get("admin_user"))
+
+def pick_class(label, key, open_only=False):
+    """
+    Searchable, paginated picker over the signed-in admin's classes.
+    Each rerun fetches one page, filtered and counted in the database.
+    Returns the selected class's settings row, or None.
+    """
+    owner_id = current_owner_id()
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        search = st.text_input("Search classes", key=f"{key}_search", placeholder="Type part of a class name").strip()
+    # A new search starts again from the first page
+    if st.session_state.get(f"{key}_searched") != search:
+        st.session_state[f"{key}_searched"] = search
+        st.session_state[f"{key}_page"] = 1
+
+    page_size = class_service.CLASS_PAGE_SIZE
+    page = st.session_state.get(f"{key}_page", 1)
+    try:
+        rows, total = class_service.list_classes(owner_id, search, page - 1, page_size, open_only)
+        total_pages = max(1, math.ceil(total / page_size))
+        if page > total_pages:
+            # Classes were removed since the page was picked
+            page = st.session_state[f"{key}_page"] = total_pages
+            rows, total = class_service.list_classes(owner_id, search, page - 1, page_size, open_only)
+    except Exception:
+        st.error("Failed to fetch classes.")
+        return None
+
+    if not total:
+        st.warning("No classes match your search." if search else "No classes found.")
+        return None
+
+    with c2:
+        st.number_input("Page", min_value=1, max_value=total_pages, step=1, key=f"{key}_page")
+
+    by_name = {row["class_name"]: row for row in rows}
+    # Selection from another page or search: fall back to the first class shown
+    if st.session_state.get(f"{key}_class") not in by_name:
+        st.session_state.pop(f"{key}_class", None)
+    selected = st.selectbox(label, list(by_name), key=f"{key}_class")
+    first = (page - 1) * page_size + 1
+    st.caption(f"Classes {first}–{first + len(rows) - 1} of {total}")
+    return dict(by_name[selected]) if selected else None
@@ -0,0 +1,113 @@
+# Attendence/components/matrix_ui.py
+import math
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import streamlit as st
+from Attendence.services import archive_service, attendance_service
+from Attendence.core.utils import current_ist_date
+
+PRESENT_CSS = "background-color:#d4edda;color:green"
+ABSENT_CSS = "background-color:#f8d7da;color:red"
+PAGE_SIZES = [25, 50, 100, 200]
+DEFAULT_DATE_WINDOW = 14
+WINDOW_OPTIONS = ["Last 4 Weeks", "Last N Sessions", "Custom Range", "Current Semester", "All History"]
+
+def _status_css(block: pd.DataFrame) -> pd.DataFrame:
+    # One vectorized pass over the visible block instead of a callback per cell
+    return pd.DataFrame(
+        np.where(block.to_numpy() == "P", PRESENT_CSS, ABSENT_CSS),
+        index=block.index,
+        columns=block.columns,
+    )
+
+def select_date_window(class_name, key):
+    """
+    Date-window picker shared by the admin, analytics and chatbot panels.
+    Returns (start_date, end_date) as YYYY-MM-DD strings; (None, None) means the
+    current semester (the live table), which has to be chosen explicitly.
+    "All History" also reaches back into the class's archived semesters.
+    """
+    today = current_ist_date()
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        window = st.selectbox("Date Window", WINDOW_OPTIONS, key=f"{key}_window")
+
+    if window == "Last 4 Weeks":
+        start = datetime.strptime(today, "%Y-%m-%d") - timedelta(weeks=4)
+        return start.strftime("%Y-%m-%d"), today
+
+    if window == "Last N Sessions":
+        with c2:
+            n = st.number_input("Sessions", min_value=1, value=10, step=1, key=f"{key}_sessions")
+        try:
+            sessions = attendance_service.get_session_dates(class_name)
+        except Exception:
+            st.error("Failed to fetch session dates.")
+            return None, None
+        if not sessions:
+            return None, None
+        return sessions[-n] if n <= len(sessions) else sessions[0], sessions[-1]
+
+    if window == "Custom Range":
+        default_start = datetime.strptime(today, "%Y-%m-%d") - timedelta(weeks=4)
+        with c2:
+            picked = st.date_input("Range", value=(default_start, datetime.strptime(today, "%Y-%m-%d")), key=f"{key}_range")
+        if len(picked) != 2:
+            # Range still being picked
+            return picked[0].strftime("%Y-%m-%d"), today
+        return picked[0].strftime("%Y-%m-%d"), picked[1].strftime("%Y-%m-%d")
+
+    if window == "All History":
+        try:
+            archives = archive_service.list_archives(class_name)
+        except Exception:
+            st.error("Failed to load semester archives.")
+            archives = []
+        if archives:
+            return archives[0]["start_date"], None
+
+    return None, None
+
+def render_attendance_matrix(pivot_df: pd.DataFrame, key: str):
+    """
+    Renders a page of students x a window of dates from the attendance matrix.
+    Only the visible slice is styled and sent to the browser.
+    """
+    meta_cols = list(pivot_df.columns[:2])
+    date_cols = list(pivot_df.columns[2:])
+    total_rows = len(pivot_df)
+
+    c1, c2, c3 = st.columns([1, 1, 3])
+    with c1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    total_pages = max(1, math.ceil(total_rows / page_size))
+    # Widget state can outlive the data it was chosen for (class switch, fewer rows)
+    if st.session_state.get(f"{key}_page", 1) > total_pages:
+        st.session_state[f"{key}_page"] = total_pages
+    if any(d not in date_cols for d in st.session_state.get(f"{key}_dates", ())):
+        del st.session_state[f"{key}_dates"]
+    with c2:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key=f"{key}_page")
+    with c3:
+        if len(date_cols) > 1:
+            default_start = date_cols[max(0, len(date_cols) - DEFAULT_DATE_WINDOW)]
+            start_date, end_date = st.select_slider(
+                "Dates shown",
+                options=date_cols,
+                value=(default_start, date_cols[-1]),
+                key=f"{key}_dates",
+            )
+            visible_dates = date_cols[date_cols.index(start_date):date_cols.index(end_date) + 1]
+        else:
+            visible_dates = date_cols
+
+    row_start = (page - 1) * page_size
+    visible = pivot_df.iloc[row_start:row_start + page_size][meta_cols + visible_dates]
+
+    styled = visible.style.apply(_status_css, axis=None, subset=visible_dates)
+    st.dataframe(styled, width="stretch", hide_index=True)
+    st.caption(
+        f"Students {row_start + 1 if total_rows else 0}–{min(row_start + page_size, total_rows)} of {total_rows} · "
+        f"{len(visible_dates)} of {len(date_cols)} dates"
+    )
@@ -1,18 +1,22 @@
 # Attendence/components/student_ui.py
 import streamlit as st
-from Attendence.services import class_service, attendance_service
+from Attendence.services import class_service, attendance_service, journal_service
+from Attendence.core import codes
 from Attendence.core.utils import current_ist_date
 from Attendence.core.logger import get_logger
 
 logger = get_logger(__name__)
 
 def show_student_panel():
+    # Replays check-ins a previous process journaled but never delivered
+    journal_service.start_replay()
+
     col_title, col_refresh = st.columns([4, 1])
     with col_title:
         st.title("🎓 Student Attendance Portal")
     with col_refresh:
         if st.button("🔄 Refresh"):
-             class_service.get_open_classes.clear()
+             class_service.refresh_classes()
              st.rerun()
 
     try:
@@ -25,25 +29,17 @@ def show_student_panel():
         st.warning("🚫 No classrooms are currently open for attendance.")
         st.stop()
 
-    selected_class = st.selectbox("Select Your Class", class_list)
-
-    # We need settings for the selected class to check code and limit
-    # The optimized way is to fetch all classes and find the one.
-    # Or add get_class_settings to service.
-    # For now, let's just fetch all classes again or rely on class_service to provide a helper.
-    # To keep it simple, I'll assume we can get class details.
-    
-    # Since class_service.get_all_classes() returns all data, we can use that.
-    classes = class_service.get_all_classes()
-    settings = next((c for c in classes if c["class_name"] == selected_class), None)
-    
-    if not settings:
-        st.error("Class settings not found.")
+    # A room can link straight to its class with ?class=<name>; otherwise students type to search
+    linked_class = st.query_params.get("class")
+    selected_class = st.selectbox(
+        "Select Your Class",
+        class_list,
+        index=class_list.index(linked_class) if linked_class in class_list else None,
+        placeholder=f"Type to search {len(class_list)} open classes",
+    )
+    if not selected_class:
         return
 
-    required_code = settings["code"]
-    daily_limit = settings["daily_limit"]
-
     roll_number_raw = st.text_input("Roll Number").strip()
 
     if not roll_number_raw:
@@ -69,47 +65,47 @@ def show_student_panel():
     else:
         name = st.text_input("Name (Will be locked after first time)").strip()
 
-    code_input = st.text_input("Attendance Code")
+    # A scanned QR carries the current code in the link
+    code_input = st.text_input("Attendance Code", value=st.query_params.get("code", ""))
 
     if st.button("✅ Submit Attendance"):
         today = current_ist_date()
 
-        if code_input != required_code:
+        # Rotating codes are checked locally against the clock, before any lookup
+        rotating = codes.rotating_codes_enabled()
+        if rotating and not codes.verify_code(selected_class, code_input):
             st.error("❌ Incorrect attendance code.")
             st.stop()
 
-        # Check existing
-        if attendance_service.check_existing_attendance(selected_class, roll_number, today):
-            st.error("❌ Attendance already marked today.")
-            st.stop()
+        settings = class_service.get_class_settings(selected_class)
+        if not settings:
+            st.error("Class settings not found.")
             return
 
-        # Check limit
-        count = attendance_service.get_daily_count(selected_class, today)
-        if count >= daily_limit:
-            st.warning("⚠️ Attendance limit for today has been reached.")
+        if not rotating and code_input != settings["code"]:
+            st.error("❌ Incorrect attendance code.")
             st.stop()
-            return
 
-        # Lock roll map if needed
-        if not locked_name:
-            try:
-                attendance_service.lock_roll_map(selected_class, roll_number, name)
-            except Exception:
-                 st.error("Failed to lock roll number.")
-                 st.stop()
-                 return
-        elif locked_name != name:
+        if locked_name and locked_name != name:
              st.error("❌ Roll number already locked to a different name.")
              st.stop()
              return
 
-        # Mark attendance
+        # Duplicate check, limit check, name lock and insert run together, queued per class
         try:
-            attendance_service.submit_attendance(selected_class, roll_number, name, today)
-            st.success("✅ Attendance submitted successfully!")
+            status = attendance_service.record_checkin(
+                selected_class, roll_number, name, settings["daily_limit"], today, lock_name=not locked_name
+            )
         except Exception:
             st.error("Failed to submit attendance.")
+            return
+
+        if status == "duplicate":
+            st.error("❌ Attendance already marked today.")
+        elif status == "limit":
+            st.warning("⚠️ Attendance limit for today has been reached.")
+        else:
+            st.success("✅ Attendance submitted successfully!")
 
 def show_view_attendance_panel():
     col_sub, col_ref = st.columns([4,1])
@@ -117,7 +113,7 @@ def show_view_attendance_panel():
         st.subheader("📅 Check Your Attendance Record")
     with col_ref:
         if st.button("🔄 Refresh", key="refresh_view"):
-            class_service.get_open_classes.clear()
+            class_service.refresh_classes()
             st.rerun()
 
     try:
@@ -144,35 +140,25 @@ def show_view_attendance_panel():
 
         try:
             # Fetch ALL records to get proper date range (to know absents)
-            all_records = attendance_service.fetch_attendance_records(selected_class)
+            frame = attendance_service.fetch_attendance_frame(selected_class)
         except Exception:
             st.error("Failed to fetch records.")
             return
 
-        if not all_records:
+        if frame.empty:
             st.info("No attendance records found for this class.")
             return
 
         import pandas as pd
         import matplotlib.pyplot as plt
 
-        df = pd.DataFrame(all_records)
-
-        # Coerce roll_number to ensure type match
-        df["roll_number"] = pd.to_numeric(df["roll_number"], errors="coerce")
-        df = df.dropna(subset=["roll_number"])
-        df["roll_number"] = df["roll_number"].astype(int)
-        
         # Identification of all unique dates for this class
-        all_dates = sorted(df["date"].unique())
+        all_dates = attendance_service.days_to_iso(sorted(frame["day"].unique()))
         total_classes = len(all_dates)
 
-        # Filter for student
-        my_records = df[df["roll_number"] == roll_number]
-        
         # Robustly count present days (unique dates present)
-        my_present_dates = my_records["date"].unique()
-        present_count = len(my_present_dates)
+        present_dates = set(attendance_service.days_to_iso(frame.loc[frame["roll_number"] == roll_number, "day"].unique()))
+        present_count = len(present_dates)
         
         # Absent count is simply total - present
         absent_count = total_classes - present_count
@@ -219,7 +205,6 @@ def show_view_attendance_panel():
             # We want to show ALL dates and status P/A
             # Create a dataframe of all dates
             history_data = []
-            present_dates = set(my_records["date"].unique())
             
             for date in sorted(all_dates, reverse=True):
                 status = "✅ Present" if date in present_dates else "❌ Absent"
@@ -0,0 +1,69 @@
+# Attendence/core/cache.py
+import copy
+import functools
+import sys
+import threading
+import time
+
+# Streamlit's cache decorators when Streamlit is loaded, otherwise small
+# in-process equivalents. Streamlit is always imported before the services
+# inside the app, so the app is unchanged; the CLI and batch jobs never pay
+# for importing it.
+
+def _streamlit():
+    return sys.modules.get("streamlit")
+
+class _Memo:
+    """Per-argument memo with optional TTL and `.clear(*args)`, like st.cache_*."""
+
+    def __init__(self, func, ttl=None, copy_results=False):
+        self.func = func
+        self.ttl = ttl
+        self.copy_results = copy_results
+        self.lock = threading.Lock()
+        self.entries = {}
+        functools.update_wrapper(self, func)
+
+    @staticmethod
+    def _key(args, kwargs):
+        return args, tuple(sorted(kwargs.items()))
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = self._key(args, kwargs)
+            hash(key)
+        except TypeError:
+            return self.func(*args, **kwargs)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[1] >= self.ttl):
+            entry = (self.func(*args, **kwargs), time.monotonic())
+            with self.lock:
+                self.entries[key] = entry
+        return copy.deepcopy(entry[0]) if self.copy_results else entry[0]
+
+    def clear(self, *args, **kwargs):
+        with self.lock:
+            if args or kwargs:
+                self.entries.pop(self._key(args, kwargs), None)
+            else:
+                self.entries.clear()
+
+def _decorator(st_name, func, copy_results, ttl=None, **kwargs):
+    st = _streamlit()
+    if st is not None:
+        st_decorator = getattr(st, st_name)
+        if ttl is not None:
+            kwargs["ttl"] = ttl
+        return st_decorator(func, **kwargs) if func else st_decorator(**kwargs)
+    if func is None:
+        return lambda f: _Memo(f, ttl, copy_results)
+    return _Memo(func, ttl, copy_results)
+
+def cache_data(func=None, **kwargs):
+    """st.cache_data, or a memo returning copies when Streamlit is not loaded."""
+    return _decorator("cache_data", func, True, **kwargs)
+
+def cache_resource(func=None, **kwargs):
+    """st.cache_resource, or a memo returning the shared object when Streamlit is not loaded."""
+    return _decorator("cache_resource", func, False, **kwargs)
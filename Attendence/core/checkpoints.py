@@ -0,0 +1,40 @@
+# Attendence/core/checkpoints.py
+import hashlib
+import json
+import os
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Small JSON files that let long-running jobs resume after a crash
+CHECKPOINT_DIR = "checkpoints"
+
+def _path(key):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(CHECKPOINT_DIR, f"{digest}.json")
+
+def load_checkpoint(key):
+    """Return the saved checkpoint dict for `key`, or None."""
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.exception(f"Unreadable checkpoint for {key}; starting over")
+        return None
+
+def save_checkpoint(key, data):
+    """Atomically persist `data` for `key`."""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = _path(key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, **data}, f)
+    os.replace(tmp_path, path)
+
+def clear_checkpoint(key):
+    try:
+        os.remove(_path(key))
+    except FileNotFoundError:
+        pass
@@ -1,17 +1,17 @@
 # Attendence/clients.py
-import streamlit as st
-from supabase import create_client
-from github import Github
+from .cache import cache_resource
 from .config import get_env
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
-@st.cache_resource
+@cache_resource
 def create_supabase_client():
     """
     Create and return a supabase client using st.secrets or env variables.
     """
+    from supabase import create_client
+
     try:
         url = get_env("SUPABASE_URL")
         key = get_env("SUPABASE_KEY")
@@ -37,9 +37,34 @@ def create_github_repo():
             logger.info("GitHub credentials not fully configured; GitHub features will be disabled.")
             return None, None
 
+        from github import Github
+
         gh = Github(token)
         repo = gh.get_user(username).get_repo(repo_name)
         return gh, repo
     except Exception:
         logger.exception("Failed to create GitHub repo client")
         raise
+
+@cache_resource
+def create_redis_client():
+    """
+    Optional shared cache. Returns None unless REDIS_URL is set and the
+    `redis` package is installed.
+    """
+    url = get_env("REDIS_URL")
+    if not url:
+        logger.info("REDIS_URL not configured; shared caching is disabled.")
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("REDIS_URL is set but the `redis` package is not installed; shared caching is disabled.")
+        return None
+    try:
+        client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=0.5)
+        client.ping()
+        return client
+    except Exception:
+        logger.exception("Failed to connect to Redis; shared caching is disabled.")
+        return None
@@ -0,0 +1,60 @@
+# Attendence/core/codes.py
+import hashlib
+import hmac
+import time
+from typing import Optional
+from .config import get_env
+
+# Rotating attendance codes (TOTP-style). Each class's secret is derived from
+# ATTENDANCE_CODE_SECRET, so codes are generated and checked without any
+# database lookup. Without the master secret the static class code is used.
+CODE_WINDOW_SECONDS = 30
+CODE_SKEW_WINDOWS = 1
+CODE_DIGITS = 6
+
+def _master_secret() -> Optional[bytes]:
+    secret = get_env("ATTENDANCE_CODE_SECRET")
+    return secret.encode("utf-8") if secret else None
+
+def rotating_codes_enabled() -> bool:
+    return _master_secret() is not None
+
+def _class_secret(class_name: str) -> bytes:
+    return hmac.new(_master_secret(), class_name.encode("utf-8"), hashlib.sha256).digest()
+
+def _window(at: Optional[float] = None) -> int:
+    return int((time.time() if at is None else at) // CODE_WINDOW_SECONDS)
+
+def _code_for_window(class_name: str, window: int) -> str:
+    digest = hmac.new(_class_secret(class_name), window.to_bytes(8, "big"), hashlib.sha256).digest()
+    offset = digest[-1] & 0x0F
+    value = int.from_bytes(digest[offset:offset + 4], "big") & 0x7FFFFFFF
+    return str(value % 10 ** CODE_DIGITS).zfill(CODE_DIGITS)
+
+def current_code(class_name: str, at: Optional[float] = None) -> str:
+    """The code for `class_name` in the current time window."""
+    if not rotating_codes_enabled():
+        raise RuntimeError("ATTENDANCE_CODE_SECRET is not set.")
+    return _code_for_window(class_name, _window(at))
+
+def seconds_remaining(at: Optional[float] = None) -> int:
+    now = time.time() if at is None else at
+    return CODE_WINDOW_SECONDS - int(now % CODE_WINDOW_SECONDS)
+
+def verify_code(class_name: str, code: str, at: Optional[float] = None, skew: int = CODE_SKEW_WINDOWS) -> bool:
+    """
+    True if `code` matches the class's code in the current window or up to
+    `skew` windows either side, absorbing clock drift and slow typists.
+    """
+    if not rotating_codes_enabled():
+        return False
+    code = (code or "").strip()
+    # isdigit() alone accepts full-width digits, which compare_digest rejects with TypeError
+    if len(code) != CODE_DIGITS or not (code.isascii() and code.isdigit()):
+        return False
+    window = _window(at)
+    matched = False
+    for candidate in range(window - skew, window + skew + 1):
+        # Compare every candidate so timing does not reveal which window matched
+        matched |= hmac.compare_digest(_code_for_window(class_name, candidate), code)
+    return matched
@@ -1,7 +1,7 @@
 # Attendence/config.py
 import os
+import sys
 from dotenv import load_dotenv
-import streamlit as st
 
 load_dotenv()
 
@@ -11,9 +11,11 @@ def get_env(var_name: str, default=None):
     """
     Prefer Streamlit secrets if available, else environment variable.
     """
+    # Only the app loads Streamlit; the CLI and batch jobs read the environment
+    st = sys.modules.get("streamlit")
     try:
         # st.secrets may not exist outside streamlit runtime; guard it.
-        if hasattr(st, "secrets") and st.secrets and var_name in st.secrets:
+        if st is not None and hasattr(st, "secrets") and st.secrets and var_name in st.secrets:
             return st.secrets[var_name]
     except Exception:
         # ignore streamlit secrets errors and fallback to env
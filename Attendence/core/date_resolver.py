@@ -0,0 +1,83 @@
+# Attendence/core/date_resolver.py
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+from .logger import get_logger
+from .utils import current_ist_date
+
+logger = get_logger(__name__)
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Phrases the chatbot recognizes in questions
+PHRASE_PATTERN = re.compile(
+    r"\b(?:today|yesterday|tomorrow|\d+\s+days?\s+(?:ago|before|after)"
+    r"|(?:(?:next|last|on)\s+)?(?:mon|tues|wednes|thurs|fri|satur|sun)day|next\s+\w+|\d{4}-\d{2}-\d{2})\b",
+    re.IGNORECASE,
+)
+
+_DAYS_OFFSET = re.compile(r"^(\d+)\s+days?\s+(ago|before|after)$")
+_WEEKDAY = re.compile(r"^(?:(next|last|on)\s+)?(\w+)$")
+_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def find_date_phrases(text: str):
+    return PHRASE_PATTERN.findall(text)
+
+def _resolve_fast(phrase: str, today: date) -> Optional[date]:
+    if phrase == "today":
+        return today
+    if phrase == "yesterday":
+        return today - timedelta(days=1)
+    if phrase == "tomorrow":
+        return today + timedelta(days=1)
+
+    if _ISO.match(phrase):
+        try:
+            return datetime.strptime(phrase, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+    m = _DAYS_OFFSET.match(phrase)
+    if m:
+        days = int(m.group(1))
+        return today + timedelta(days=days) if m.group(2) == "after" else today - timedelta(days=days)
+
+    m = _WEEKDAY.match(phrase)
+    if m and m.group(2) in WEEKDAYS:
+        target = WEEKDAYS.index(m.group(2))
+        if m.group(1) == "next":
+            return today + timedelta(days=(target - today.weekday() - 1) % 7 + 1)
+        if m.group(1) == "last":
+            return today - timedelta(days=(today.weekday() - target - 1) % 7 + 1)
+        # "on monday" or just "monday": the most recent one, today included
+        return today - timedelta(days=(today.weekday() - target) % 7)
+
+    return None
+
+def _resolve_fallback(phrase: str, today: date) -> Optional[date]:
+    # dateparser is slow to import and to call; only pay for it on unusual phrases
+    try:
+        from dateparser import parse as parse_date
+    except ImportError:
+        return None
+    base = datetime.combine(today, datetime.min.time())
+    resolved = parse_date(phrase, settings={"RELATIVE_BASE": base, "PREFER_DATES_FROM": "past"})
+    return resolved.date() if resolved else None
+
+@lru_cache(maxsize=2048)
+def _resolve(phrase: str, today_iso: str) -> Optional[date]:
+    # `today_iso` is part of the key, so memoized answers roll over at IST midnight
+    today = datetime.strptime(today_iso, "%Y-%m-%d").date()
+    resolved = _resolve_fast(phrase, today)
+    if resolved is None and not _ISO.match(phrase):
+        resolved = _resolve_fallback(phrase, today)
+    return resolved
+
+def resolve_date_phrase(phrase: str, today_iso: Optional[str] = None) -> Optional[date]:
+    """
+    Resolves a relative or ISO date phrase against today's IST date.
+    Supported phrases are resolved directly; anything else falls back to dateparser.
+    """
+    normalized = re.sub(r"\s+", " ", phrase.strip().lower())
+    return _resolve(normalized, today_iso or current_ist_date())
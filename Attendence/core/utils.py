@@ -1,18 +1,28 @@
 # helper class 
 
 # Attendence/utils.py
+import re
 from datetime import datetime   # date and time
 import pytz  # asia
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
+IST = pytz.timezone("Asia/Kolkata")
+
+def current_ist_datetime():
+    """Return the current timezone-aware datetime in Asia/Kolkata"""
+    return datetime.now(IST)
+
 def current_ist_date():
     """Return current date string in Asia/Kolkata as YYYY-MM-DD"""
     try:
-        IST = pytz.timezone("Asia/Kolkata")
-        return datetime.now(IST).strftime("%Y-%m-%d")
+        return current_ist_datetime().strftime("%Y-%m-%d")
     except Exception:
         logger.exception("Failed to compute IST date")
         # Fallback to UTC date string
         return datetime.now().strftime("%Y-%m-%d")
+
+def safe_filename(value):
+    """Class or label -> a string safe to use as a file or directory name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value)).strip("_") or "unnamed"
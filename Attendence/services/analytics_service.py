@@ -0,0 +1,121 @@
+# Attendence/services/analytics_service.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from Attendence.core.logger import get_logger
+from Attendence.services import attendance_service
+
+logger = get_logger(__name__)
+
+MAX_WORKERS = 8
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def summarize_class(class_name, version):
+    """
+    Per-class summary keyed by (class_name, data version).
+    A new submission changes the version, so only that class is recomputed.
+    """
+    frame = attendance_service.query_attendance_frame(class_name)
+    return summarize_frame(class_name, frame, attendance_service.get_roll_map(class_name))
+
+def summarize_frame(class_name, frame, roster=None):
+    """
+    Summary of a typed attendance frame: headline numbers, per-student
+    counts and the daily trend. Students in `roster` ({roll_number: name})
+    with no check-in count with 0 sessions present.
+    """
+    if frame.empty:
+        return {
+            "class_name": class_name,
+            "students": 0,
+            "sessions": 0,
+            "overall_pct": 0.0,
+            "per_student": pd.DataFrame(columns=["roll_number", "name", "Present_Count", "Attendance %"]),
+            "trend": pd.DataFrame(columns=["date", "present", "students"]),
+        }
+
+    df = frame.drop_duplicates(subset=["roll_number", "day"])
+
+    total_sessions = df["day"].nunique()
+    per_student = df.groupby("roll_number").agg(name=("name", "first"), Present_Count=("day", "size")).reset_index()
+    per_student["name"] = per_student["name"].astype(str)
+    missing = sorted(set(roster or ()) - set(per_student["roll_number"].tolist()))
+    if missing:
+        absent = pd.DataFrame({"roll_number": missing, "name": [roster[roll] for roll in missing], "Present_Count": 0})
+        per_student = pd.concat([per_student, absent]).sort_values("roll_number", ignore_index=True)
+    per_student["Attendance %"] = (per_student["Present_Count"] / total_sessions * 100).round(2)
+
+    total_students = len(per_student)
+    trend = df.groupby("day").size().rename("present").reset_index().sort_values("day")
+    trend.insert(0, "date", attendance_service.days_to_iso(trend.pop("day")))
+    trend["students"] = total_students
+
+    return {
+        "class_name": class_name,
+        "students": total_students,
+        "sessions": total_sessions,
+        "overall_pct": round(per_student["Present_Count"].sum() / (total_students * total_sessions) * 100, 2),
+        "per_student": per_student,
+        "trend": trend,
+    }
+
+def _summarize_latest(class_name):
+    version = attendance_service.get_class_data_version(class_name)
+    return summarize_class(class_name, version)
+
+def summarize_all_classes(class_names, threshold=75.0, max_workers=MAX_WORKERS):
+    """
+    Fetches and summarizes every class concurrently.
+    Returns (overview_df, below_threshold_df, daily_trend_df, failed_classes).
+    """
+    ctx = get_script_run_ctx()
+
+    def _init_worker():
+        # Lets cached calls inside workers behave like calls from the script thread
+        if ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    summaries, failed = [], []
+    workers = max(1, min(max_workers, len(class_names)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {name: pool.submit(_summarize_latest, name) for name in class_names}
+        for name, future in futures.items():
+            try:
+                summaries.append(future.result())
+            except Exception:
+                logger.exception(f"Failed to summarize {name}")
+                failed.append(name)
+
+    summaries = [s for s in summaries if s["students"]]
+
+    overview = pd.DataFrame(
+        [{
+            "Class": s["class_name"],
+            "Students": s["students"],
+            "Classes Held": s["sessions"],
+            "Attendance %": s["overall_pct"],
+        } for s in summaries],
+        columns=["Class", "Students", "Classes Held", "Attendance %"],
+    ).sort_values("Attendance %")
+
+    below_frames = []
+    for s in summaries:
+        low = s["per_student"][s["per_student"]["Attendance %"] < threshold]
+        if not low.empty:
+            below_frames.append(low.assign(Class=s["class_name"]))
+    below = (
+        pd.concat(below_frames, ignore_index=True)[["Class", "roll_number", "name", "Present_Count", "Attendance %"]].sort_values("Attendance %")
+        if below_frames
+        else pd.DataFrame(columns=["Class", "roll_number", "name", "Present_Count", "Attendance %"])
+    )
+
+    trend_frames = [s["trend"] for s in summaries if not s["trend"].empty]
+    if trend_frames:
+        trend = pd.concat(trend_frames).groupby("date")[["present", "students"]].sum().sort_index()
+        trend["Attendance %"] = (trend["present"] / trend["students"] * 100).round(2)
+    else:
+        trend = pd.DataFrame(columns=["present", "students", "Attendance %"])
+
+    return overview, below, trend, failed
@@ -0,0 +1,229 @@
+# Attendence/services/archive_service.py
+import json
+import os
+import shutil
+import threading
+import time
+from Attendence.core.clients import create_supabase_client
+from Attendence.core.config import get_env
+from Attendence.core.logger import get_logger
+from Attendence.core.utils import safe_filename
+
+logger = get_logger(__name__)
+
+# Archives are rows removed from the shared database, so they must live in shared,
+# durable storage: a Supabase Storage bucket holds the files and the manifest.
+# ARCHIVE_DIR is only this instance's download cache. Without ARCHIVE_BUCKET,
+# archiving is disabled and every row stays in the hot table.
+ARCHIVE_BUCKET = get_env("ARCHIVE_BUCKET")
+ARCHIVE_DIR = get_env("ARCHIVE_DIR", "archives")
+MANIFEST_OBJECT = "manifest.json"
+MANIFEST_TTL = 60
+ARCHIVE_COLUMNS = ["id", "class_name", "roll_number", "name", "date"]
+PAGE_SIZE = 1000
+DELETE_CHUNK_SIZE = 1000
+
+_manifest_lock = threading.Lock()
+_manifest_cache = {"loaded_at": float("-inf"), "data": {}}
+
+def archiving_enabled():
+    return bool(ARCHIVE_BUCKET)
+
+def _bucket(supabase=None):
+    return (supabase or create_supabase_client()).storage.from_(ARCHIVE_BUCKET)
+
+def load_manifest(supabase=None):
+    """
+    {class_name: [{semester, start_date, end_date, rows, path}, ...]}, where
+    path is the file's key in the bucket. Re-read at most every MANIFEST_TTL
+    seconds, so archives made by other instances show up.
+    """
+    if not archiving_enabled():
+        return {}
+    with _manifest_lock:
+        if time.monotonic() - _manifest_cache["loaded_at"] >= MANIFEST_TTL:
+            try:
+                data = json.loads(_bucket(supabase).download(MANIFEST_OBJECT))
+            except Exception as e:
+                # No manifest yet is the normal state of an empty bucket
+                if "not found" not in str(e).lower():
+                    logger.exception("Failed to load the archive manifest")
+                    raise
+                data = {}
+            _manifest_cache["data"], _manifest_cache["loaded_at"] = data, time.monotonic()
+        return _manifest_cache["data"]
+
+def _save_manifest(manifest, supabase=None):
+    body = json.dumps(manifest, indent=2).encode("utf-8")
+    _bucket(supabase).upload(MANIFEST_OBJECT, body, {"content-type": "application/json", "upsert": "true"})
+    with _manifest_lock:
+        _manifest_cache["data"], _manifest_cache["loaded_at"] = manifest, time.monotonic()
+
+def _local_copy(archive, supabase=None):
+    """
+    Path of a cached copy of the archive file, downloaded from the bucket when
+    this instance has none or an outdated one (a re-run rewrites the file).
+    """
+    import pyarrow.parquet as pq
+
+    path = os.path.join(ARCHIVE_DIR, archive["path"])
+    try:
+        if pq.ParquetFile(path).metadata.num_rows == archive["rows"]:
+            return path
+    except (OSError, ValueError):
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.download"
+    with open(tmp_path, "wb") as f:
+        f.write(_bucket(supabase).download(archive["path"]))
+    os.replace(tmp_path, path)
+    return path
+
+def list_archives(class_name):
+    return sorted(load_manifest().get(class_name, []), key=lambda a: a["start_date"])
+
+def archives_overlapping(class_name, start_date=None, end_date=None):
+    """
+    Archives that cover part of [start_date, end_date]. A range without a
+    start date means the current semester only, so it never touches archives.
+    """
+    if not start_date:
+        return []
+    return [
+        a for a in list_archives(class_name)
+        if a["end_date"] >= start_date and (not end_date or a["start_date"] <= end_date)
+    ]
+
+def read_archived_frame(class_name, start_date=None, end_date=None):
+    """
+    Attendance rows from the class's archives within the range, as a DataFrame
+    built straight from the Arrow columns. Files are memory-mapped and filtered
+    on read; pyarrow is imported only here. Returns None when no archive overlaps.
+    """
+    archives = archives_overlapping(class_name, start_date, end_date)
+    if not archives:
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    filters = [("date", ">=", start_date)]
+    if end_date:
+        filters.append(("date", "<=", end_date))
+
+    tables = []
+    for archive in archives:
+        try:
+            tables.append(pq.read_table(_local_copy(archive), columns=ARCHIVE_COLUMNS, memory_map=True, filters=filters))
+        except Exception:
+            logger.exception(f"Failed to read archive {archive['path']}")
+            raise
+    return pa.concat_tables(tables).to_pandas()
+
+def _fetch_range(class_name, start_date, end_date, supabase):
+    rows, start = [], 0
+    while True:
+        page = (
+            supabase.table("attendance").select(",".join(ARCHIVE_COLUMNS))
+            .eq("class_name", class_name)
+            .gte("date", start_date)
+            .lte("date", end_date)
+            .order("id")
+            .range(start, start + PAGE_SIZE - 1)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+def archive_semester(class_name, semester, start_date, end_date, supabase=None, progress=None):
+    """
+    Moves a closed semester's attendance rows into a zstd-compressed Parquet
+    file (one per class/semester) and deletes them from the hot table.
+    The file is written, verified and uploaded to ARCHIVE_BUCKET before any
+    row is deleted, and the deletes are by id, so a failed run can simply be
+    repeated. Returns a report dict.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not archiving_enabled():
+        raise RuntimeError("ARCHIVE_BUCKET is not set; archived rows need shared storage before they leave the database.")
+    if not supabase:
+        supabase = create_supabase_client()
+
+    key = f"{safe_filename(class_name)}/{safe_filename(semester)}.parquet"
+    path = os.path.join(ARCHIVE_DIR, key)
+    manifest = load_manifest(supabase)
+    existing = [a for a in manifest.get(class_name, []) if a["semester"] == semester]
+
+    try:
+        rows = _fetch_range(class_name, start_date, end_date, supabase)
+    except Exception:
+        logger.exception(f"Failed to read rows to archive for {class_name}")
+        raise
+
+    if rows:
+        table = pa.Table.from_pylist(rows).select(ARCHIVE_COLUMNS)
+        table = table.set_column(
+            table.schema.get_field_index("roll_number"), "roll_number", table.column("roll_number").cast(pa.int32())
+        )
+        if existing:
+            # Re-run after a partial delete: keep what was archived before
+            previous = pq.read_table(_local_copy(existing[0], supabase), memory_map=True).cast(table.schema)
+            known_ids = set(previous.column("id").to_pylist())
+            fresh = [i for i, row_id in enumerate(table.column("id").to_pylist()) if row_id not in known_ids]
+            table = pa.concat_tables([previous, table.take(fresh)])
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        if pq.ParquetFile(tmp_path).metadata.num_rows != table.num_rows:
+            raise RuntimeError(f"Archive verification failed for {path}")
+        with open(tmp_path, "rb") as f:
+            _bucket(supabase).upload(key, f.read(), {"content-type": "application/octet-stream", "upsert": "true"})
+        os.replace(tmp_path, path)
+
+        entry = {
+            "semester": semester,
+            "start_date": start_date,
+            "end_date": end_date,
+            "rows": table.num_rows,
+            "path": key,
+        }
+        manifest = dict(manifest)
+        manifest[class_name] = [a for a in manifest.get(class_name, []) if a["semester"] != semester] + [entry]
+        _save_manifest(manifest, supabase)
+
+    ids = [row["id"] for row in rows]
+    deleted = 0
+    try:
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            chunk = ids[start:start + DELETE_CHUNK_SIZE]
+            supabase.table("attendance").delete(returning="minimal").eq("class_name", class_name).in_("id", chunk).execute()
+            deleted += len(chunk)
+            if progress:
+                progress(deleted, len(ids))
+    except Exception:
+        logger.exception(f"Archive of {class_name}/{semester} saved, but hot-table cleanup stopped at {deleted}/{len(ids)}")
+        raise
+
+    logger.info(f"Archived {len(rows)} rows of {class_name} ({semester}) to {ARCHIVE_BUCKET}/{key}")
+    return {"rows": len(rows), "path": key if rows else None, "deleted": deleted}
+
+def remove_class_archives(class_name, supabase=None):
+    """
+    Deletes a class's archive files from the bucket and this instance's cache,
+    then its manifest entry. Safe to repeat.
+    """
+    if not archiving_enabled():
+        return 0
+    manifest = load_manifest(supabase)
+    archives = manifest.get(class_name, [])
+    if archives:
+        _bucket(supabase).remove([a["path"] for a in archives])
+        manifest = {name: entries for name, entries in manifest.items() if name != class_name}
+        _save_manifest(manifest, supabase)
+    shutil.rmtree(os.path.join(ARCHIVE_DIR, safe_filename(class_name)), ignore_errors=True)
+    return len(archives)
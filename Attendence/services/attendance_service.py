@@ -1,32 +1,361 @@
 # Attendence/services/attendance_service.py
-import streamlit as st
-from Attendence.core.clients import create_supabase_client
+import io
+import threading
+import time
+import numpy as np
+import pandas as pd
+from Attendence.core.cache import cache_data, cache_resource
+from Attendence.core.clients import create_supabase_client, create_redis_client
 from Attendence.core.logger import get_logger
 from Attendence.core.utils import current_ist_date
+from Attendence.services import archive_service, journal_service
 
 logger = get_logger(__name__)
 
-@st.cache_data(ttl=30)
-def fetch_attendance_records(class_name, supabase=None):
+PAGE_SIZE = 1000
+ROLL_MAP_TTL = 300
+CHECKIN_SYNC_TTL = 30
+
+FRAME_COLUMNS = ["id", "roll_number", "name", "date"]
+EPOCH = pd.Timestamp("1970-01-01")
+
+def _empty_frame():
+    return pd.DataFrame({
+        "id": pd.Series(dtype="int64"),
+        "roll_number": pd.Series(dtype="int32"),
+        "name": pd.Series(dtype="category"),
+        "day": pd.Series(dtype="int32"),
+    })
+
+def _type_frame(df):
+    """
+    (id, roll_number, name, date) -> typed columns: int32 roll numbers,
+    categorical names and int32 day ordinals (days since 1970-01-01).
+    Dates are parsed once per distinct value, not once per row.
+    """
+    if df.empty:
+        return _empty_frame()
+    rolls = pd.to_numeric(df["roll_number"], errors="coerce")
+    df = df[rolls.notna()]
+    dates = df["date"].astype("category")
+    day_of_category = ((pd.to_datetime(dates.cat.categories, format="%Y-%m-%d") - EPOCH).days).to_numpy("int32")
+    return pd.DataFrame({
+        "id": df["id"].fillna(0).to_numpy("int64"),
+        "roll_number": rolls[rolls.notna()].to_numpy("int32"),
+        "name": pd.Categorical(df["name"].to_numpy()),
+        "day": day_of_category[dates.cat.codes.to_numpy()],
+    })
+
+def days_to_iso(days):
+    """Day ordinals -> 'YYYY-MM-DD' strings."""
+    return (EPOCH + pd.to_timedelta(pd.Index(days, dtype="int64"), unit="D")).strftime("%Y-%m-%d").tolist()
+
+def iso_to_day(date):
+    return int((pd.Timestamp(date) - EPOCH).days)
+
+def query_attendance_frame(class_name, start_date=None, end_date=None, supabase=None):
+    """
+    Uncached attendance query, optionally limited to an inclusive date range.
+    Use when the caller keys its own cache on `get_class_data_version` and must
+    not see a stale 30s snapshot. Only the needed columns are fetched, in pages
+    as CSV, and parsed once into typed columns (see `_type_frame`), never as a
+    list of dicts. Ranges reaching into archived semesters are completed from
+    the Parquet archives.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    pages, start = [], 0
+    try:
+        while True:
+            query = supabase.table("attendance").select(",".join(FRAME_COLUMNS)).eq("class_name", class_name)
+            if start_date:
+                query = query.gte("date", start_date)
+            if end_date:
+                query = query.lte("date", end_date)
+            text = query.order("id").range(start, start + PAGE_SIZE - 1).csv().execute().data
+            lines = text.splitlines() if isinstance(text, str) else []
+            # Keep the header from the first page only
+            pages.append("\n".join(lines if not pages else lines[1:]))
+            if len(lines) - 1 < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+    except Exception:
+        logger.exception(f"Failed to fetch attendance frame for {class_name}")
+        raise
+
+    body = "\n".join(page for page in pages if page)
+    if body.count("\n") == 0:
+        raw = pd.DataFrame(columns=FRAME_COLUMNS)
+    else:
+        raw = pd.read_csv(io.StringIO(body), dtype={"name": str, "date": str})
+
+    archived = archive_service.read_archived_frame(class_name, start_date, end_date)
+    if archived is not None and not archived.empty:
+        raw = pd.concat([raw, archived[FRAME_COLUMNS]], ignore_index=True)
+
+    return _type_frame(raw)
+
+@cache_resource
+def _class_partitions():
+    # Process-wide per-class state, so one class's check-in rush never blocks
+    # or invalidates another: {class_name: {"lock", "generation", "date", "rolls", "synced_at"}}
+    return {"lock": threading.Lock(), "classes": {}}
+
+def _partition(class_name):
+    partitions = _class_partitions()
+    with partitions["lock"]:
+        part = partitions["classes"].get(class_name)
+        if part is None:
+            part = {"lock": threading.RLock(), "generation": 0, "date": None, "rolls": set(), "synced_at": float("-inf")}
+            partitions["classes"][class_name] = part
+        return part
+
+@cache_data(ttl=30)
+def _fetch_attendance_frame(class_name, start_date, end_date, generation):
+    # `generation` only keys the cache; `invalidate_class_data` bumps it
+    return query_attendance_frame(class_name, start_date, end_date)
+
+def fetch_attendance_frame(class_name, start_date=None, end_date=None):
+    return _fetch_attendance_frame(class_name, start_date, end_date, _partition(class_name)["generation"])
+
+def invalidate_class_data(class_name):
+    """
+    Drops cached attendance data for one class only (records, session dates,
+    data version). Other classes keep their caches.
+    """
+    part = _partition(class_name)
+    with part["lock"]:
+        part["generation"] += 1
+    get_session_dates.clear(class_name)
+    get_class_data_version.clear(class_name)
+
+@cache_data(ttl=60)
+def get_session_dates(class_name, supabase=None):
+    """
+    Sorted distinct dates on which the class took attendance.
+    Paged like `query_attendance_frame`: a single request stops at the API's
+    row cap and would only see the oldest dates.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    dates, start = set(), 0
+    try:
+        while True:
+            rows = (
+                supabase.table("attendance").select("date").eq("class_name", class_name)
+                .order("date").order("id").range(start, start + PAGE_SIZE - 1).execute().data
+            ) or []
+            dates.update(row["date"] for row in rows)
+            if len(rows) < PAGE_SIZE:
+                return sorted(dates)
+            start += PAGE_SIZE
+    except Exception:
+        logger.exception(f"Failed to fetch session dates for {class_name}")
+        raise
+
+@cache_data(ttl=10)
+def get_class_data_version(class_name, supabase=None):
+    return query_class_data_version(class_name, supabase)
+
+def query_class_data_version(class_name, supabase=None):
+    """
+    Cheap change marker for a class: "<row count>:<latest id>".
+    Any insert or delete on the class's attendance rows changes it.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        response = supabase.table("attendance").select("id", count="exact").eq("class_name", class_name).order("id", desc=True).limit(1).execute()
+        latest_id = response.data[0]["id"] if response.data else 0
+        return f"{response.count or 0}:{latest_id}"
+    except Exception:
+        logger.exception(f"Failed to get data version for {class_name}")
+        raise
+
+def query_roll_map(class_name, supabase=None):
+    """
+    Returns {roll_number: name} for a class in one paged scan.
+    """
     if not supabase:
         supabase = create_supabase_client()
     try:
-        # Defaults to ordering by date desc
-        response = supabase.table("attendance").select("*").eq("class_name", class_name).order("date", desc=True).execute()
-        return response.data if response.data else []
+        names, start = {}, 0
+        while True:
+            response = (
+                supabase.table("roll_map").select("roll_number,name")
+                .eq("class_name", class_name)
+                .order("roll_number")
+                .range(start, start + PAGE_SIZE - 1)
+                .execute()
+            )
+            rows = response.data or []
+            names.update({int(r["roll_number"]): r["name"] for r in rows})
+            if len(rows) < PAGE_SIZE:
+                return names
+            start += PAGE_SIZE
     except Exception:
-        logger.exception(f"Failed to fetch attendance for {class_name}")
+        logger.exception(f"Failed to fetch roll map for {class_name}")
         raise
 
+@cache_resource
+def _roll_map_cache():
+    # Process-wide, shared by every session: {class_name: {"version", "loaded_at", "names"}},
+    # plus this process's own version counters for when Redis is not configured
+    return {"lock": threading.Lock(), "classes": {}, "versions": {}}
+
+def _shared_key(class_name):
+    return f"attendance:roll_map:{class_name}"
+
+def _version_key(class_name):
+    return f"attendance:roll_map_version:{class_name}"
+
+def get_roll_map_version(class_name):
+    """
+    Version of a class's roll map, bumped by every lock and invalidation.
+    Kept in Redis when configured, so each instance sees the others' changes.
+    """
+    redis_client = create_redis_client()
+    if redis_client:
+        try:
+            return int(redis_client.get(_version_key(class_name)) or 0)
+        except Exception:
+            logger.exception("Shared roll map version read failed")
+    return _roll_map_cache()["versions"].get(class_name, 0)
+
+def _bump_local_version(class_name):
+    cache = _roll_map_cache()
+    with cache["lock"]:
+        cache["versions"][class_name] = cache["versions"].get(class_name, 0) + 1
+        return cache["versions"][class_name]
+
+def _load_shared_roll_map(class_name):
+    redis_client = create_redis_client()
+    if not redis_client:
+        return None
+    try:
+        cached = redis_client.hgetall(_shared_key(class_name))
+        return {int(roll): name for roll, name in cached.items()} if cached else None
+    except Exception:
+        logger.exception("Shared roll map read failed; falling back to the database")
+        return None
+
+def _store_shared_roll_map(class_name, names, version):
+    redis_client = create_redis_client()
+    if not redis_client or not names:
+        return
+    key, version_key = _shared_key(class_name), _version_key(class_name)
+
+    def store(pipe):
+        # Loaded under `version`: if a lock or invalidation bumped it meanwhile, this copy may be stale
+        if int(pipe.get(version_key) or 0) != version:
+            return
+        pipe.multi()
+        pipe.hset(key, mapping=names)
+        pipe.expire(key, ROLL_MAP_TTL)
+
+    try:
+        redis_client.transaction(store, version_key)
+    except Exception:
+        logger.exception("Shared roll map write failed")
+
+def get_roll_map(class_name, supabase=None):
+    """
+    Cached roll -> name map for a class. Loaded in one query, then served locally
+    until ROLL_MAP_TTL expires or its version (`get_roll_map_version`) changes.
+    """
+    cache = _roll_map_cache()
+    # Read before the map, so a change landing during the load forces another one
+    version = get_roll_map_version(class_name)
+    entry = cache["classes"].get(class_name)
+    if entry and entry["version"] == version and time.monotonic() - entry["loaded_at"] < ROLL_MAP_TTL:
+        return entry["names"]
+
+    names = _load_shared_roll_map(class_name)
+    if names is None:
+        try:
+            names = query_roll_map(class_name, supabase)
+        except Exception:
+            if not journal_service.journal_enabled():
+                raise
+            # The journal keeps check-ins going while the database is unreachable
+            logger.warning(f"Using cached roll map for {class_name}; database load failed")
+            return entry["names"] if entry else {}
+        _store_shared_roll_map(class_name, names, version)
+
+    with cache["lock"]:
+        cache["classes"][class_name] = {"version": version, "loaded_at": time.monotonic(), "names": names}
+    return names
+
+def invalidate_roll_map(class_name):
+    """
+    Drops the cached map after bulk changes (roster import, class deletion)
+    by bumping its version, here and for every other instance.
+    """
+    _bump_local_version(class_name)
+    redis_client = create_redis_client()
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(_version_key(class_name))
+            pipe.delete(_shared_key(class_name))
+            pipe.execute()
+        except Exception:
+            logger.exception("Shared roll map invalidation failed")
+
+def _remember_roll(class_name, roll_number, name):
+    cache = _roll_map_cache()
+    version = _bump_local_version(class_name)
+    with cache["lock"]:
+        entry = cache["classes"].get(class_name)
+        if entry:
+            entry["names"][roll_number] = name
+            # Already applied here; with Redis, the shared version still moves on and reloads it
+            entry["version"] = version
+    redis_client = create_redis_client()
+    if redis_client:
+        key, version_key = _shared_key(class_name), _version_key(class_name)
+
+        def add_roll(pipe):
+            # Only extend a complete map: after an invalidation the key is gone, and a
+            # one-entry hash would be served as the whole class until it expired
+            exists = pipe.exists(key)
+            pipe.multi()
+            if exists:
+                pipe.hset(key, roll_number, name)
+                pipe.expire(key, ROLL_MAP_TTL)
+            pipe.incr(version_key)
+
+        try:
+            # WATCH the key so a concurrent invalidation aborts and re-checks the update
+            redis_client.transaction(add_roll, key)
+        except Exception:
+            logger.exception("Shared roll map update failed")
+
 def fetch_roll_map(class_name, roll_number, supabase=None):
+    """
+    Name locked to a roll number, or None. With the submission journal enabled,
+    an unreachable database counts as "not locked": the lock is journaled with
+    the check-in, and an earlier lock still wins when it is replayed.
+    """
+    name = get_roll_map(class_name, supabase).get(roll_number)
+    if name:
+        return name
+
+    # Miss: the roll may have been locked by another instance since the map was loaded
     if not supabase:
         supabase = create_supabase_client()
     try:
         response = supabase.table("roll_map").select("name").eq("class_name", class_name).eq("roll_number", roll_number).execute()
-        return response.data[0]["name"] if response.data else None
+        name = response.data[0]["name"] if response.data else None
     except Exception:
+        if journal_service.journal_enabled():
+            logger.warning(f"Roll map lookup for {class_name} failed; treating roll {roll_number} as not locked")
+            return None
         logger.exception("Failed to fetch roll map")
         raise
+    if name:
+        _remember_roll(class_name, roll_number, name)
+    return name
 
 def lock_roll_map(class_name, roll_number, name, supabase=None):
     if not supabase:
@@ -37,6 +366,7 @@ def lock_roll_map(class_name, roll_number, name, supabase=None):
             "roll_number": roll_number,
             "name": name
         }).execute()
+        _remember_roll(class_name, roll_number, name)
     except Exception:
         logger.exception("Failed to lock roll map")
         raise
@@ -59,12 +389,39 @@ def get_daily_count(class_name, date=None, supabase=None):
     if not supabase:
         supabase = create_supabase_client()
     try:
-        response = supabase.table("attendance").select("*", count="exact").eq("class_name", class_name).eq("date", date).execute()
+        # head=True: the server returns only the count, no rows
+        response = supabase.table("attendance").select("id", count="exact", head=True).eq("class_name", class_name).eq("date", date).execute()
         return response.count or 0
     except Exception:
         logger.exception("Failed to get daily count")
         raise
 
+def fetch_checkins_since(class_name, after_id=0, date=None, limit=50, supabase=None):
+    """
+    Check-ins for a class/date with id > after_id, oldest first.
+    Lets a poller fetch only the delta since its last refresh; with after_id=0
+    it returns the most recent `limit` check-ins instead of the oldest.
+    """
+    if not date:
+        date = current_ist_date()
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        response = (
+            supabase.table("attendance").select("id,roll_number,name")
+            .eq("class_name", class_name)
+            .eq("date", date)
+            .gt("id", after_id)
+            .order("id", desc=not after_id)
+            .limit(limit)
+            .execute()
+        )
+        rows = response.data or []
+        return rows if after_id else rows[::-1]
+    except Exception:
+        logger.exception("Failed to fetch latest check-ins")
+        raise
+
 def submit_attendance(class_name, roll_number, name, date=None, supabase=None):
     if not date:
         date = current_ist_date()
@@ -77,8 +434,163 @@ def submit_attendance(class_name, roll_number, name, date=None, supabase=None):
             "name": name,
             "date": date
         }).execute()
-        fetch_attendance_records.clear()
+        invalidate_class_data(class_name)
         return True
     except Exception:
         logger.exception("Failed to submit attendance")
         raise
+
+def query_records_after(class_name, after_id=0, supabase=None):
+    """
+    Hot-table rows (id, roll_number, name, date) with id > after_id, oldest
+    first, paged by id. Lets incremental consumers read only what is new.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    rows = []
+    try:
+        while True:
+            page = (
+                supabase.table("attendance").select("id,roll_number,name,date")
+                .eq("class_name", class_name)
+                .gt("id", after_id)
+                .order("id")
+                .limit(PAGE_SIZE)
+                .execute()
+            ).data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            after_id = page[-1]["id"]
+    except Exception:
+        logger.exception(f"Failed to fetch new attendance rows for {class_name}")
+        raise
+
+def query_checked_in_rolls(class_name, date=None, supabase=None):
+    """
+    Roll numbers already marked present for a class on a date.
+    """
+    if not date:
+        date = current_ist_date()
+    if not supabase:
+        supabase = create_supabase_client()
+    rolls, start = set(), 0
+    try:
+        while True:
+            page = (
+                supabase.table("attendance").select("roll_number")
+                .eq("class_name", class_name)
+                .eq("date", date)
+                .order("id")
+                .range(start, start + PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            rolls.update(int(row["roll_number"]) for row in page)
+            if len(page) < PAGE_SIZE:
+                return rolls
+            start += PAGE_SIZE
+    except Exception:
+        logger.exception(f"Failed to fetch today's check-ins for {class_name}")
+        raise
+
+def _sync_checked_in_rolls(part, class_name, date, supabase):
+    journaled = journal_service.journal_enabled()
+    try:
+        rolls = query_checked_in_rolls(class_name, date, supabase)
+    except Exception:
+        if not journaled:
+            raise
+        # The journal keeps check-ins going while the database is unreachable
+        logger.warning(f"Using cached check-ins for {class_name}; database sync failed")
+        rolls = part["rolls"] if part["date"] == date else set()
+    if journaled:
+        rolls = rolls | journal_service.pending_rolls(class_name, date)
+    part["rolls"] = rolls
+    part["date"] = date
+    part["synced_at"] = time.monotonic()
+
+def record_checkin(class_name, roll_number, name, daily_limit, date=None, supabase=None, lock_name=False):
+    """
+    Duplicate check, daily-limit check and insert for one student, serialized
+    per class. Returns "submitted", "duplicate" or "limit".
+    With `lock_name` the roll number is locked to `name` after the checks and
+    before the insert; if the lock fails, nothing is recorded and it raises.
+    Today's checked-in rolls are kept per class and re-synced from the database
+    every CHECKIN_SYNC_TTL seconds, so other app instances' check-ins are seen;
+    the unique key on (class_name, roll_number, date) remains the final guard.
+    With the submission journal enabled the check-in (and lock) is committed
+    locally and acknowledged at once; `journal_service` replays it to the database.
+    """
+    if not date:
+        date = current_ist_date()
+    part = _partition(class_name)
+    with part["lock"]:
+        if part["date"] != date or time.monotonic() - part["synced_at"] >= CHECKIN_SYNC_TTL:
+            _sync_checked_in_rolls(part, class_name, date, supabase)
+
+        if roll_number in part["rolls"]:
+            return "duplicate"
+        if len(part["rolls"]) >= daily_limit:
+            return "limit"
+
+        if journal_service.journal_enabled():
+            # The lock is journaled with the check-in and replayed ahead of it
+            if not journal_service.enqueue_submission(class_name, roll_number, name, date, lock_name):
+                part["rolls"].add(roll_number)
+                return "duplicate"
+            part["rolls"].add(roll_number)
+            if lock_name:
+                _remember_roll(class_name, roll_number, name)
+            return "submitted"
+
+        if lock_name:
+            lock_roll_map(class_name, roll_number, name, supabase)
+
+        try:
+            submit_attendance(class_name, roll_number, name, date, supabase)
+        except Exception:
+            # Lost a race with another instance: the row exists after all
+            if check_existing_attendance(class_name, roll_number, date, supabase):
+                part["rolls"].add(roll_number)
+                return "duplicate"
+            raise
+        part["rolls"].add(roll_number)
+        return "submitted"
+
+def build_attendance_matrix(data, roster=None):
+    """
+    Pivots attendance into the wide matrix used across the app:
+    roll_number, name, then one 'P'/'A' column per date, sorted by roll number.
+    Accepts a typed frame (`fetch_attendance_frame`) or a list of records.
+    `roster` ({roll_number: name}, e.g. `get_roll_map`) adds the students with
+    no check-in in the data as all 'A'.
+    """
+    frame = data if isinstance(data, pd.DataFrame) else _type_frame(pd.DataFrame(data, columns=FRAME_COLUMNS))
+    if frame.empty:
+        return pd.DataFrame(columns=["roll_number", "name"])
+
+    # One row per (roll, name) pair, one column per day; fill a P/A grid directly
+    names = frame["name"].astype("category")
+    keys = frame["roll_number"].to_numpy("int64") * (len(names.cat.categories) + 1) + names.cat.codes.to_numpy()
+    row_keys, row_idx = np.unique(keys, return_inverse=True)
+    days, col_idx = np.unique(frame["day"].to_numpy(), return_inverse=True)
+
+    grid = np.full((len(row_keys), len(days)), "A", dtype=object)
+    grid[row_idx, col_idx] = "P"
+
+    first = np.zeros(len(row_keys), dtype="int64")
+    first[row_idx[::-1]] = np.arange(len(frame))[::-1]
+    pivot_df = pd.DataFrame(grid, columns=days_to_iso(days))
+    pivot_df.insert(0, "name", names.iloc[first].astype(str).to_numpy())
+    pivot_df.insert(0, "roll_number", frame["roll_number"].to_numpy()[first].astype(int))
+    return _add_absent_students(pivot_df, roster)
+
+def _add_absent_students(pivot_df, roster):
+    missing = sorted(set(roster or ()) - set(pivot_df["roll_number"].tolist()))
+    if not missing:
+        return pivot_df
+    absent = pd.DataFrame("A", index=range(len(missing)), columns=pivot_df.columns[2:])
+    absent.insert(0, "name", [roster[roll] for roll in missing])
+    absent.insert(0, "roll_number", missing)
+    merged = pd.concat([pivot_df, absent], ignore_index=True)
+    return merged.sort_values("roll_number", kind="stable", ignore_index=True)
@@ -1,5 +1,18 @@
 # Attendence/services/auth_service.py
+import hashlib
+import hmac
+import os
+from Attendence.core.clients import create_supabase_client
 from Attendence.core.config import get_env
+from Attendence.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUPER_ADMIN = "super_admin"
+# scrypt parameters: ~16 MB and a few tens of milliseconds per check
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
 
 def authenticate_admin(username, password):
     """
@@ -8,3 +21,48 @@ def authenticate_admin(username, password):
     admin_user = get_env("ADMIN_USERNAME")
     admin_pass = get_env("ADMIN_PASSWORD")
     return username == admin_user and password == admin_pass
+
+def hash_password(password):
+    """Hash to store in `users.password_hash`: scrypt$<salt hex>$<hash hex>."""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"scrypt${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored_hash):
+    try:
+        scheme, salt, expected = stored_hash.split("$")
+        if scheme != "scrypt":
+            return False
+        digest = hashlib.scrypt(password.encode("utf-8"), salt=bytes.fromhex(salt), n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    except (AttributeError, ValueError):
+        return False
+    return hmac.compare_digest(digest.hex(), expected)
+
+def authenticate(username, password, supabase=None):
+    """
+    Returns the signed-in admin as {"id", "name", "role"}, or None.
+    The ADMIN_USERNAME account is the super admin and manages every class;
+    admins in the `users` table manage the classes assigned to them in
+    `class_owners`.
+    """
+    if authenticate_admin(username, password):
+        return {"id": None, "name": username, "role": SUPER_ADMIN}
+    if not username or not password:
+        return None
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        rows = supabase.table("users").select("id, name, role, password_hash").eq("email", username).limit(1).execute().data
+    except Exception:
+        logger.exception("Failed to look up user")
+        return None
+    if not rows or not verify_password(password, rows[0]["password_hash"]):
+        return None
+    user = rows[0]
+    return {"id": user["id"], "name": user.get("name") or username, "role": user.get("role") or "admin"}
+
+def owner_scope(user):
+    """The owner id to filter classes by, or None when the user sees every class."""
+    if not user or user.get("role") == SUPER_ADMIN:
+        return None
+    return user["id"]
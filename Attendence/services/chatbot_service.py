@@ -1,29 +1,26 @@
 # Attendence/services/chatbot_service.py
+import ast
+import bisect
+import contextvars
+import functools
 import pandas as pd
 import re
-from datetime import datetime
-from dateparser import parse as parse_date
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Optional, Any
 from pydantic import BaseModel
 from langgraph.graph import StateGraph
 from langchain_google_genai import ChatGoogleGenerativeAI
+from Attendence.core.config import get_env
 from Attendence.core.logger import get_logger
+from Attendence.core.date_resolver import find_date_phrases, resolve_date_phrase
+from Attendence.core.utils import current_ist_date
 from langchain_groq import ChatGroq
 
 logger = get_logger(__name__)
 
-# --- LLM Setup ---
-# Note: Ensure GOOGLE_API_KEY is in .env or environment
-try:
-    gemini_llm = ChatGroq(
-    model_name = "llama-3.3-70b-versatile",
-    temperature=0.3
-    )
-    
-except Exception:
-    logger.warning("Failed to initialize ChatGoogleGenerativeAI. Check API Key.")
-    gemini_llm = None
-
 # --- Load prompt examples ---
 try:
     with open("Prompts/few_shot_prompt.txt", "r", encoding="utf-8") as f:
@@ -32,12 +29,251 @@ except FileNotFoundError:
     logger.warning("Prompts/few_shot_prompt.txt not found.")
     EXAMPLES = ""
 
+# --- LLM Providers ---
+class LLMResponse(BaseModel):
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+class LLMProvider(ABC):
+    """
+    Anything that turns a prompt into text. Implement `complete`; token counts
+    are optional and estimated when a provider doesn't report them.
+    """
+    name = "base"
+
+    @abstractmethod
+    def complete(self, prompt: str) -> LLMResponse:
+        ...
+
+class LangChainProvider(LLMProvider):
+    """Wraps a LangChain chat model (ChatGroq, ChatGoogleGenerativeAI, ...)."""
+    def __init__(self, llm, name: str = "langchain"):
+        self.llm = llm
+        self.name = name
+
+    def complete(self, prompt: str) -> LLMResponse:
+        message = self.llm.invoke(prompt)
+        usage = getattr(message, "usage_metadata", None) or {}
+        return LLMResponse(
+            text=message.content,
+            prompt_tokens=usage.get("input_tokens"),
+            completion_tokens=usage.get("output_tokens"),
+        )
+
+class FakeLLM(LLMProvider):
+    """
+    Deterministic offline LLM for profiling and regression runs.
+    Code prompts are answered from the few-shot examples (exact question, or
+    the same template with its dates/names/numbers swapped in); summary
+    prompts echo the raw result.
+    """
+    name = "fake"
+
+    def __init__(self, examples: str = None):
+        self.answers = {}
+        self.templates = {}
+        pairs = re.findall(r"Question:\s*(.+?)\n(.+?)(?:\n\s*\n|\Z)", EXAMPLES if examples is None else examples, re.DOTALL)
+        for question, code in pairs:
+            question, code = question.strip(), code.strip()
+            self.answers[question.lower().rstrip("?.!")] = code
+            template, params = templatize_question(question)
+            self.templates.setdefault(template, (code, params))
+
+    def _code_for(self, question: str) -> Optional[str]:
+        code = self.answers.get(question.strip().lower().rstrip("?.!"))
+        if code:
+            return code
+        template, params = templatize_question(question)
+        if template not in self.templates:
+            return None
+        code, example_params = self.templates[template]
+        for slot, value in params.items():
+            if slot in example_params:
+                code = code.replace(str(example_params[slot]), str(value))
+        return code
+
+    def complete(self, prompt: str) -> LLMResponse:
+        if "### User Input:" in prompt:
+            question = prompt.rsplit("### User Input:", 1)[1].strip()
+            code = self._code_for(question)
+            text = f"CODE: {code}" if code else "TEXT: I can only answer questions like the examples."
+        elif "**Raw Data Result**:" in prompt:
+            raw = prompt.split("**Raw Data Result**:", 1)[1].split("**Task**", 1)[0].strip()
+            text = f"Result: {raw}"
+        else:
+            text = "Earlier questions were about class attendance."
+        return LLMResponse(text=text)
+
+def _default_provider() -> Optional[LLMProvider]:
+    if (get_env("CHATBOT_LLM", "") or "").lower() == "fake":
+        return FakeLLM()
+    try:
+        return LangChainProvider(ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.3), name="groq")
+    except Exception:
+        logger.warning("Failed to initialize ChatGroq. Check GROQ_API_KEY.")
+        return None
+
+_llm = {"provider": None, "ready": False}
+_llm_lock = threading.Lock()
+
+def get_llm() -> Optional[LLMProvider]:
+    with _llm_lock:
+        if not _llm["ready"]:
+            _llm["provider"] = _default_provider()
+            _llm["ready"] = True
+        return _llm["provider"]
+
+def set_llm(provider: Optional[LLMProvider]):
+    """Swaps the LLM for the whole process, e.g. `set_llm(FakeLLM())` offline."""
+    with _llm_lock:
+        _llm["provider"] = provider
+        _llm["ready"] = True
+
+# --- Run Metrics ---
+class RunMetrics:
+    """Seconds spent per node and token usage for one question."""
+    def __init__(self):
+        self.timings = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "timings": dict(self.timings),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_calls": self.llm_calls,
+        }
+
+_current_metrics = contextvars.ContextVar("chatbot_metrics", default=None)
+
+def _timed(node_name: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(state):
+            started = time.perf_counter()
+            try:
+                return fn(state)
+            finally:
+                metrics = _current_metrics.get()
+                if metrics is not None:
+                    metrics.timings[node_name] = metrics.timings.get(node_name, 0.0) + time.perf_counter() - started
+        return wrapper
+    return decorator
+
+def _complete(prompt: str) -> str:
+    """Runs a prompt through the active provider and records its token usage."""
+    provider = get_llm()
+    if provider is None:
+        raise RuntimeError("LLM not initialized.")
+    response = provider.complete(prompt)
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.llm_calls += 1
+        metrics.prompt_tokens += response.prompt_tokens if response.prompt_tokens is not None else estimate_tokens(prompt)
+        metrics.completion_tokens += response.completion_tokens if response.completion_tokens is not None else estimate_tokens(response.text)
+    return response.text.strip()
+
 # --- Schemas ---
 class AppState(BaseModel):
     question: str
     code: Optional[str] = None
     result: Optional[Any] = None
     answer: Optional[str] = None
+    # Large results, shown to the user as a table instead of through the LLM
+    table: Optional[Any] = None
+    history: Optional[str] = None
+    last_result: Optional[Any] = None
+    context_key: Optional[Any] = None
+    plan_key: Optional[str] = None
+    plan_params: Optional[dict] = None
+    plan_hit: Optional[bool] = None
+
+
+# --- Conversation Memory ---
+MEMORY_TOKEN_BUDGET = 600
+MEMORY_KEEP_RECENT = 3
+SUMMARY_TOKEN_BUDGET = 200
+TURN_MAX_CHARS = 400
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+def describe_result(result: Any) -> str:
+    """One-line description of a result, used instead of re-serializing it."""
+    if isinstance(result, pd.DataFrame):
+        return f"DataFrame with {len(result)} rows, columns {list(result.columns)[:8]}"
+    if isinstance(result, pd.Series):
+        return f"Series of length {len(result)}"
+    if isinstance(result, (list, tuple, set)):
+        return f"{type(result).__name__} of {len(result)} items"
+    text = str(result)
+    return text if len(text) <= 80 else f"{type(result).__name__}: {text[:77]}..."
+
+class ConversationMemory:
+    """
+    Bounded chat memory for follow-up questions.
+    The last few turns are kept verbatim; older turns are folded into a running
+    summary once the rendered memory exceeds `token_budget`. The latest result is
+    kept as an object and exposed to generated code as `last_result`, so only a
+    short description of it ever enters the prompt.
+    """
+    def __init__(self, token_budget: int = MEMORY_TOKEN_BUDGET, keep_recent: int = MEMORY_KEEP_RECENT):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary = ""
+        self.turns = []
+        self.last_result = None
+
+    def add_turn(self, question: str, answer: str, result: Any = None):
+        if len(answer) > TURN_MAX_CHARS:
+            answer = answer[:TURN_MAX_CHARS] + "..."
+        self.turns.append((question, answer))
+        if result is not None:
+            self.last_result = result
+        self._compact()
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Earlier in this conversation: {self.summary}")
+        for question, answer in self.turns:
+            parts.append(f"User: {question}\nAssistant: {answer}")
+        if self.last_result is not None:
+            parts.append(f"`last_result` holds the previous result ({describe_result(self.last_result)}).")
+        return "\n".join(parts)
+
+    def _compact(self):
+        if estimate_tokens(self.render()) <= self.token_budget or len(self.turns) <= self.keep_recent:
+            return
+        overflow = self.turns[:-self.keep_recent]
+        self.turns = self.turns[-self.keep_recent:]
+        self.summary = self._summarize(overflow)
+
+    def _summarize(self, turns) -> str:
+        transcript = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in turns)
+        prompt = f"""
+Update the running summary of a conversation about class attendance data.
+Keep names, dates, thresholds and conclusions the user may refer back to. At most 3 sentences.
+
+Current summary: {self.summary or "(none)"}
+
+New turns:
+{transcript}
+
+Updated summary:
+"""
+        try:
+            summary = _complete(prompt)
+        except Exception:
+            logger.warning("Summarization failed; keeping a truncated transcript instead.")
+            summary = f"{self.summary} " + " ".join(f"Asked: {q}" for q, _ in turns)
+        # Hard cap so the summary itself can never grow without bound
+        max_chars = SUMMARY_TOKEN_BUDGET * 4
+        return summary if len(summary) <= max_chars else summary[-max_chars:]
 
 
 # --- Context Engineering ---
@@ -76,6 +312,302 @@ def generate_context_summary(df: pd.DataFrame) -> str:
     """
     return summary
 
+
+# --- Class Contexts ---
+CONTEXT_CACHE_SIZE = 8
+
+class ClassContext:
+    """
+    Everything the agent needs about one class matrix, prepared once and shared
+    by every session asking about the same class/version.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.date_cols = sorted(c for c in df.columns if re.match(r"\d{4}-\d{2}-\d{2}", str(c)))
+        self.latest_date = self.date_cols[-1] if self.date_cols else None
+        self.date_set = set(self.date_cols)
+        self.summary = generate_context_summary(df)
+        self.head_sample = df.head(3).to_string(index=False)
+        names = sorted({str(n) for n in df["name"].dropna()}, key=len, reverse=True) if "name" in df.columns else []
+        # Longest first, so "Ann Lee" wins over "Ann"
+        self.name_pattern = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b", re.IGNORECASE) if names else None
+        self.names_by_lower = {n.lower(): n for n in names}
+
+    def nearest_date_before(self, iso_date: str) -> Optional[str]:
+        """Latest class date on or before `iso_date` (binary search on the sorted index)."""
+        i = bisect.bisect_right(self.date_cols, iso_date)
+        return self.date_cols[i - 1] if i else None
+
+_contexts = OrderedDict()
+_contexts_lock = threading.Lock()
+
+def has_class_context(key) -> bool:
+    with _contexts_lock:
+        return key in _contexts
+
+def prepare_class_context(key, df: pd.DataFrame) -> ClassContext:
+    """
+    Registers the matrix for `key` (e.g. (class_name, data_version, start, end))
+    in a small process-wide LRU and returns its context.
+    """
+    with _contexts_lock:
+        if key in _contexts:
+            _contexts.move_to_end(key)
+            return _contexts[key]
+    ctx = ClassContext(df)
+    with _contexts_lock:
+        _contexts[key] = ctx
+        _contexts.move_to_end(key)
+        while len(_contexts) > CONTEXT_CACHE_SIZE:
+            _contexts.popitem(last=False)
+    return ctx
+
+def get_class_context(key) -> ClassContext:
+    with _contexts_lock:
+        ctx = _contexts.get(key)
+        if ctx is not None:
+            _contexts.move_to_end(key)
+    if ctx is None:
+        raise KeyError(f"No prepared context for {key!r}; call prepare_class_context first.")
+    return ctx
+
+# --- Plan Cache ---
+# Generated code is schema-generic: the same question shape works on any class
+# matrix. Validated code is stored per question template with its literals
+# lifted into slot variables, compiled once, and re-bound on later hits.
+PLAN_CACHE_SIZE = 256
+UNSAFE_NAMES = {"eval", "exec", "compile", "open", "__import__", "globals", "locals", "vars", "getattr", "setattr", "delattr", "input", "breakpoint"}
+
+class Plan:
+    def __init__(self, source: str, code_obj, slots: list):
+        self.source = source
+        self.code_obj = code_obj
+        self.slots = slots
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+def templatize_question(question: str, ctx: Optional[ClassContext] = None):
+    """
+    Abstracts dates, student names and numbers out of a question.
+    "Who has less than 75% attendance?" -> ("who has less than {num0}% attendance", {"num0": 75})
+    """
+    params = {}
+    counters = {"date": 0, "name": 0, "num": 0}
+
+    def slot(kind, value):
+        name = f"{kind}{counters[kind]}"
+        counters[kind] += 1
+        params[name] = value
+        return "{" + name + "}"
+
+    template = re.sub(r"\b\d{4}-\d{2}-\d{2}\b", lambda m: slot("date", m.group(0)), question)
+    if ctx and ctx.name_pattern:
+        template = ctx.name_pattern.sub(lambda m: slot("name", ctx.names_by_lower[m.group(0).lower()]), template)
+    template = re.sub(
+        r"(?<![\w{])\d+(?:\.\d+)?(?![\w}])",
+        lambda m: slot("num", float(m.group(0)) if "." in m.group(0) else int(m.group(0))),
+        template,
+    )
+    template = re.sub(r"\s+", " ", template).strip().rstrip("?.!").strip().lower()
+    return template, params
+
+def _slot_match(constant, value) -> Optional[str]:
+    """"exact" or "percent" if the literal stands for the slot value, else None."""
+    if type(constant) is type(value) and constant == value:
+        return "exact"
+    # Percent thresholds usually appear as fractions in code: 75 -> 0.75
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(constant, float) and abs(constant * 100 - value) < 1e-9:
+        return "percent"
+    return None
+
+def _liftable_constants(tree) -> set:
+    """ids of literals in positions a question's value can fill: comparison operands and subscripts/slice bounds."""
+    liftable = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Compare):
+            liftable += [node.left, *node.comparators]
+        elif isinstance(node, ast.Subscript):
+            liftable.append(node.slice)
+        elif isinstance(node, ast.Slice):
+            liftable += [node.lower, node.upper]
+    return {id(node) for node in liftable if isinstance(node, ast.Constant)}
+
+class _SlotLifter(ast.NodeTransformer):
+    """Replaces the chosen literal nodes ({id(node): (slot, match)}) with references to their slot."""
+    def __init__(self, targets: dict):
+        self.targets = targets
+
+    def visit_Constant(self, node):
+        if id(node) not in self.targets:
+            return node
+        name, match = self.targets[id(node)]
+        ref = ast.Name(id=name, ctx=ast.Load())
+        if match == "percent":
+            ref = ast.BinOp(left=ref, op=ast.Div(), right=ast.Constant(100))
+        return ast.copy_location(ref, node)
+
+def _is_safe(tree) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+            return False
+        if isinstance(node, ast.Name) and (node.id in UNSAFE_NAMES or node.id.startswith("__") or node.id == "last_result"):
+            return False
+    return True
+
+def build_plan(code: str, params: dict) -> Optional[Plan]:
+    """
+    Parses generated code and lifts every slot value into a variable.
+    Each value must appear exactly once, as a comparison operand or a
+    subscript/slice bound; a value that also appears elsewhere (say `axis=1`
+    for "more than 1 day") is ambiguous. Returns None when the code cannot be
+    safely generalized: it is not a single expression, uses unsafe names or
+    `last_result`, has a missing or ambiguous slot, or still embeds a slot
+    value inside a larger literal.
+    """
+    try:
+        tree = ast.parse(code, mode="eval")
+    except SyntaxError:
+        return None
+    if not _is_safe(tree):
+        return None
+
+    liftable = _liftable_constants(tree)
+    constants = [node for node in ast.walk(tree) if isinstance(node, ast.Constant)]
+    targets = {}
+    for name, value in params.items():
+        matches = [(node, _slot_match(node.value, value)) for node in constants]
+        matches = [(node, match) for node, match in matches if match]
+        if len(matches) != 1 or id(matches[0][0]) not in liftable or id(matches[0][0]) in targets:
+            return None
+        targets[id(matches[0][0])] = (name, matches[0][1])
+    tree = ast.fix_missing_locations(_SlotLifter(targets).visit(tree))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if any(str(v) in node.value for v in params.values() if isinstance(v, str)):
+                return None
+
+    return Plan(ast.unparse(tree), compile(tree, "<plan>", "eval"), sorted(params))
+
+def lookup_plan(template: str) -> Optional[Plan]:
+    with _plans_lock:
+        plan = _plans.get(template)
+        if plan is not None:
+            _plans.move_to_end(template)
+        return plan
+
+def drop_plan(template: str):
+    with _plans_lock:
+        _plans.pop(template, None)
+
+def store_plan(template: str, plan: Plan):
+    with _plans_lock:
+        _plans[template] = plan
+        _plans.move_to_end(template)
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+
+def _is_error_result(result) -> bool:
+    return isinstance(result, str) and (result.startswith("ERROR") or "Error" in result or "Traceback" in result)
+
+# --- Result Formatting ---
+RESULT_INLINE_CHARS = 1500
+RESULT_TOP_N = 10
+TABLE_PREVIEW_ROWS = 5
+TABLE_MIN_ROWS = 20
+TABLE_STATS_COLUMNS = 8
+
+def _numeric_stats(values: pd.Series) -> Optional[str]:
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return None
+    values = values.dropna()
+    if values.empty:
+        return None
+    return f"mean {values.mean():.2f}, min {values.min():g}, max {values.max():g}"
+
+def _format_items(items: list) -> tuple:
+    count = len(items)
+    text = repr(items)
+    if count <= RESULT_TOP_N and len(text) <= RESULT_INLINE_CHARS:
+        return text, None
+    shown = ", ".join(str(item) for item in items[:RESULT_TOP_N])
+    text = f"{count} items. First {min(count, RESULT_TOP_N)}: {shown}"
+    if count > RESULT_TOP_N:
+        text += f" (and {count - RESULT_TOP_N} more)"
+    table = pd.DataFrame({"value": items}) if count > TABLE_MIN_ROWS else None
+    return text, table
+
+def _format_series(series: pd.Series) -> tuple:
+    count = len(series)
+    text = series.to_string()
+    if count <= RESULT_TOP_N and len(text) <= RESULT_INLINE_CHARS:
+        return text, None
+    parts = [f"Series of {count} values"]
+    stats = _numeric_stats(series)
+    if stats:
+        parts.append(stats)
+    parts.append(f"First {RESULT_TOP_N}:\n{series.head(RESULT_TOP_N).to_string()}")
+    # to_frame, not reset_index: that fails when the index and values share a name
+    table = series.to_frame() if count > TABLE_MIN_ROWS else None
+    return "\n".join(parts), table
+
+def _format_frame(df: pd.DataFrame) -> tuple:
+    text = df.to_string()
+    if len(df) <= RESULT_TOP_N and len(text) <= RESULT_INLINE_CHARS:
+        return text, None
+    parts = [f"Table with {len(df)} rows and {len(df.columns)} columns: {list(df.columns)[:TABLE_STATS_COLUMNS]}"]
+    for column in df.columns[:TABLE_STATS_COLUMNS]:
+        if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+            stats = _numeric_stats(df[column])
+            if stats:
+                parts.append(f"{column}: {stats}")
+        else:
+            try:
+                counts = df[column].value_counts()
+            except TypeError:
+                # Unhashable cells (lists, dicts) cannot be counted
+                continue
+            if len(counts) <= RESULT_TOP_N:
+                parts.append(f"{column}: " + ", ".join(f"{value} x{n}" for value, n in counts.items()))
+    # Wide matrices get trimmed columns too, so the preview stays a few lines
+    preview = df.iloc[:TABLE_PREVIEW_ROWS, :TABLE_STATS_COLUMNS].to_string()
+    parts.append(f"First {TABLE_PREVIEW_ROWS} rows:\n{preview}")
+    return "\n".join(parts), df if len(df) > TABLE_MIN_ROWS else None
+
+def _truncate(text: str) -> str:
+    if len(text) > RESULT_INLINE_CHARS:
+        return text[:RESULT_INLINE_CHARS] + f"... ({len(text)} characters in total)"
+    return text
+
+def format_result(result: Any) -> tuple:
+    """
+    Serializes a code result for the synthesis prompt, bounded by size.
+    Small results go in verbatim. Bigger ones become counts, stats and the
+    first RESULT_TOP_N items; results longer than TABLE_MIN_ROWS also come back
+    as a DataFrame for the UI to show directly.
+    Never raises: anything it cannot summarize goes in as truncated text.
+    Returns (prompt_text, table or None).
+    """
+    try:
+        return _format_result(result)
+    except Exception:
+        logger.exception("Failed to format result; sending it as text")
+        return _truncate(str(result)), None
+
+def _format_result(result: Any) -> tuple:
+    if isinstance(result, pd.DataFrame):
+        return _format_frame(result)
+    if isinstance(result, pd.Series):
+        return _format_series(result)
+    if isinstance(result, dict):
+        return _format_series(pd.Series(result))
+    if isinstance(result, (list, tuple, set, pd.Index)) or hasattr(result, "tolist"):
+        items = result.tolist() if hasattr(result, "tolist") else list(result)
+        if isinstance(items, list):
+            return _format_items(items)
+        result = items
+    return _truncate(str(result)), None
+
 # --- Prompt Builder ---
 def build_prompt(question: str, df: pd.DataFrame) -> str:
     context_summary = generate_context_summary(df)
@@ -103,47 +635,44 @@ Write a SINGLE line of Python code using pandas to answer the question.
 
 
 # --- Date Normalization ---
-def normalize_dates_in_question(inputs: dict, df) -> dict:
+def normalize_dates_in_question(inputs: dict, ctx: ClassContext) -> dict:
     question = inputs["question"]
+    today = current_ist_date()
 
-    possible_phrases = re.findall(
-        r"\b(?:today|yesterday|tomorrow|\d+\s+days?\s+(?:ago|before|after)|next\s+\w+|on\s+\w+day|\d{4}-\d{2}-\d{2})\b",
-        question,
-        re.IGNORECASE,
-    )
-
-    for phrase in possible_phrases:
-        resolved = parse_date(phrase)
+    for phrase in find_date_phrases(question):
+        resolved = resolve_date_phrase(phrase, today)
         if resolved:
             formatted = resolved.strftime("%Y-%m-%d")
-            # If future date, return error
-            if resolved > datetime.today():
+            # If future date, return error (ISO strings compare chronologically)
+            if formatted > today:
                  # We return error as result immediately
                 return {"error": f"⚠️ Attendance can't be checked for a future date: {formatted}"}
             
             # Check if date exists in columns
-            if formatted not in df.columns:
-                # Find latest date if possible
-                date_cols = [c for c in df.columns if re.match(r"\d{4}-\d{2}-\d{2}", str(c))]
-                latest = max(date_cols) if date_cols else "N/A"
-                return {"error": f"⚠️ Date '{formatted}' not found in records. Latest date is: {latest}"}
+            if formatted not in ctx.date_set:
+                nearest = ctx.nearest_date_before(formatted)
+                hint = f" Nearest earlier class: {nearest}." if nearest and nearest != ctx.latest_date else ""
+                return {"error": f"⚠️ Date '{formatted}' not found in records. Latest date is: {ctx.latest_date or 'N/A'}.{hint}"}
             
             question = question.replace(phrase, formatted)
 
     return {"question": question}
 
 # --- Prompt Builder ---
-def build_prompt(question: str, df: pd.DataFrame) -> str:
-    context_summary = generate_context_summary(df)
-    head_sample = df.head(3).to_string(index=False)
+def build_prompt(question: str, ctx: ClassContext, history: Optional[str] = None) -> str:
+    history_block = f"""
+### Conversation So Far
+{history}
+Resolve follow-ups ("and yesterday?", "of those...") against this. Use `last_result` to build on the previous result.
+""" if history else ""
     
     return f"""
 You are a smart attendance assistant. You have access to a pandas DataFrame `df`.
 
-{context_summary}
+{ctx.summary}
 
 ### Sample Data
-{head_sample}
+{ctx.head_sample}
 
 ### Instructions
 1. **Analyze the User's Input**:
@@ -152,7 +681,7 @@ You are a smart attendance assistant. You have access to a pandas DataFrame `df`
 
 2. **Rules for Code**:
    - Use `df` variable.
-   - Filter `date_cols` dynamically if needed.
+   - `date_cols` (sorted date columns) and `latest_date` are pre-defined.
    - Return ONLY the code prefixed with `CODE:`.
 
 ### Examples
@@ -160,27 +689,39 @@ Q: Hi, who are you?
 A: TEXT: I am your Attendance Assistant. Ask me anything about class records!
 
 Q: {EXAMPLES}
-
+{history_block}
 ### User Input: {question}
 """
 
 # --- Nodes ---
-def normalize_node(state: AppState, df) -> AppState:
+@_timed("normalize")
+def normalize_node(state: AppState) -> AppState:
     try:
-        out = normalize_dates_in_question({"question": state.question}, df)
+        ctx = get_class_context(state.context_key)
+        out = normalize_dates_in_question({"question": state.question}, ctx)
         if "error" in out:
             return AppState(question=state.question, result=out["error"], answer=out["error"])
-        return AppState(question=out["question"])
+        return AppState(question=out["question"], history=state.history, last_result=state.last_result)
     except Exception as e:
         logger.exception("Error in normalize_node")
         return AppState(question=state.question, result=f"Error processing dates: {e}")
 
-def generate_code_node(state: AppState, df: pd.DataFrame) -> AppState:
-    if not gemini_llm:
+@_timed("generate_code")
+def generate_code_node(state: AppState) -> AppState:
+    if not get_llm():
         return AppState(question=state.question, code="", result="LLM not initialized.")
     try:
-        prompt = build_prompt(state.question, df)
-        response = gemini_llm.invoke(prompt).content.strip()
+        ctx = get_class_context(state.context_key)
+        plan_key, plan_params = templatize_question(state.question, ctx)
+        plan = lookup_plan(plan_key)
+        if plan:
+            return AppState(
+                question=state.question, code=plan.source, last_result=state.last_result,
+                plan_key=plan_key, plan_params=plan_params, plan_hit=True,
+            )
+
+        prompt = build_prompt(state.question, ctx, state.history)
+        response = _complete(prompt)
         
         # Intent Parsing
         if response.startswith("TEXT:"):
@@ -191,28 +732,65 @@ def generate_code_node(state: AppState, df: pd.DataFrame) -> AppState:
             code = response.replace("CODE:", "").strip()
             # Remove any markdown backticks if present
             code = code.replace("```python", "").replace("```", "").strip()
-            return AppState(question=state.question, code=code)
+            return AppState(question=state.question, code=code, last_result=state.last_result, plan_key=plan_key, plan_params=plan_params)
         else:
             # Fallback: Assume it's code if it looks like code, else text
             if "df" in response or "pd." in response:
-                return AppState(question=state.question, code=response)
+                return AppState(question=state.question, code=response, last_result=state.last_result, plan_key=plan_key, plan_params=plan_params)
             return AppState(question=state.question, code=None, result=response)
             
     except Exception as e:
         logger.exception("Error in generate_code_node")
         return AppState(question=state.question, code="", result=f"LLM Error: {e}")
 
-def execute_code_node(state: AppState, df: pd.DataFrame) -> AppState:
+def _regenerate(state: AppState) -> AppState:
+    """Drops a cached plan that failed and asks the LLM for fresh code."""
+    drop_plan(state.plan_key)
+    fresh = generate_code_node(state.model_copy(update={"plan_hit": False}))
+    updates = {k: v for k, v in fresh.model_dump().items() if v is not None}
+    return state.model_copy(update={**updates, "plan_hit": False})
+
+@_timed("execute")
+def execute_code_node(state: AppState) -> AppState:
     if not state.code:
         # No code to execute (was a greeting or error)
         return AppState(question=state.question, code=None, result=state.result)
     try:
-        # Unsafe eval (as per user request domain)
-        result = eval(state.code, {"df": df.copy(), "pd": pd, "re": re})
+        ctx = get_class_context(state.context_key)
+        env = {
+            "df": ctx.df.copy(),
+            "pd": pd,
+            "re": re,
+            "date_cols": list(ctx.date_cols),
+            "latest_date": ctx.latest_date,
+            "last_result": state.last_result,
+        }
+        if state.plan_hit:
+            # Cached plan: bind this question's values, no parsing or compiling
+            plan = lookup_plan(state.plan_key)
+            try:
+                result = eval(plan.code_obj if plan else state.code, {**env, **state.plan_params})
+            except Exception:
+                result = None
+                failed = True
+            else:
+                failed = _is_error_result(result)
+            if failed:
+                logger.warning(f"Cached plan failed for '{state.plan_key}'; regenerating")
+                return execute_code_node.__wrapped__(_regenerate(state))
+        else:
+            # Unsafe eval (as per user request domain)
+            result = eval(state.code, env)
+            # Only standalone questions seed the cache; follow-ups lean on the conversation
+            if state.plan_key and not state.history and not _is_error_result(result):
+                plan = build_plan(state.code, state.plan_params)
+                if plan:
+                    store_plan(state.plan_key, plan)
         return AppState(question=state.question, code=state.code, result=result)
     except Exception as e:
         return AppState(question=state.question, code=state.code, result=f"ERROR executing code: {str(e)}")
 
+@_timed("respond")
 def format_response(state: AppState) -> AppState:
     """
     Synthesizes a final natural language response using the LLM.
@@ -221,7 +799,7 @@ def format_response(state: AppState) -> AppState:
     result = state.result
     
     # If the result is an error, just return it
-    if isinstance(result, str) and (result.startswith("ERROR") or "Error" in result or "Traceback" in result):
+    if _is_error_result(result):
          return AppState(question=question, result=result, answer=f"❌ I encountered an issue: {result}")
 
     # If we already have a text result (from greeting), refine it or pass through
@@ -229,45 +807,45 @@ def format_response(state: AppState) -> AppState:
          # It was a greeting, just ensure it's clean
          return AppState(question=question, result=result, answer=result)
 
+    # Bounded serialization: big results are summarized, and the full table goes to the UI
+    result_text, table = format_result(result)
+    table_note = "\n    - The full table is shown below your response; summarize it instead of listing rows." if table is not None else ""
+
     # Synthesis Prompt
     summary_prompt = f"""
     You are an AI assistant summarizing data results.
     
     **User's Question**: "{question}"
-    **Raw Data Result**: {result}
+    **Raw Data Result**: {result_text}
     
     **Task**: Write a helpful, natural language response.
     - Do NOT repeat the question.
     - Be concise but friendly.
     - If the result is a list of names, list them clearly.
-    - If the result is a number, explain what it means.
+    - If the result is a number, explain what it means.{table_note}
     
     **Response**:
     """
     
     try:
-        final_answer = gemini_llm.invoke(summary_prompt).content.strip()
+        final_answer = _complete(summary_prompt)
     except Exception:
-        final_answer = str(result)
+        final_answer = result_text
 
     # Update state
     state_dict = state.model_dump()
     state_dict["answer"] = final_answer
+    state_dict["table"] = table
     return AppState(**state_dict)
 
 
 # --- Entry Point ---
-def get_agent_for_df(df: pd.DataFrame):
-    def norm(state): return normalize_node(state, df)
-    def codegen(state): return generate_code_node(state, df)
-    def execute(state): return execute_code_node(state, df)
-    def respond(state): return format_response(state)
-
+def _build_agent():
     graph = StateGraph(AppState)
-    graph.add_node("normalize", norm)
-    graph.add_node("generate_code", codegen)
-    graph.add_node("execute", execute)
-    graph.add_node("respond", respond)
+    graph.add_node("normalize", normalize_node)
+    graph.add_node("generate_code", generate_code_node)
+    graph.add_node("execute", execute_code_node)
+    graph.add_node("respond", format_response)
 
     graph.set_entry_point("normalize")
     graph.add_edge("normalize", "generate_code")
@@ -276,3 +854,27 @@ def get_agent_for_df(df: pd.DataFrame):
     graph.set_finish_point("respond")
 
     return graph.compile()
+
+# Compiled once per process; the class matrix travels by `context_key`
+AGENT = _build_agent()
+
+def ask(question: str, context_key, memory: Optional["ConversationMemory"] = None) -> dict:
+    """
+    Runs one question against a prepared class context.
+    The result includes `metrics`: seconds per node and LLM token usage.
+    """
+    state = AppState(
+        question=question,
+        context_key=context_key,
+        history=(memory.render() or None) if memory else None,
+        last_result=memory.last_result if memory else None,
+    )
+    metrics = RunMetrics()
+    token = _current_metrics.set(metrics)
+    started = time.perf_counter()
+    try:
+        result = AGENT.invoke(state)
+    finally:
+        _current_metrics.reset(token)
+    metrics.timings["total"] = time.perf_counter() - started
+    return {**result, "metrics": metrics.as_dict()}
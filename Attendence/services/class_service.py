@@ -1,84 +1,387 @@
 # Attendence/services/class_service.py
-import streamlit as st
+import threading
+import time
+from datetime import datetime, timezone
+from Attendence.core.cache import cache_data, cache_resource
 from Attendence.core.clients import create_supabase_client
 from Attendence.core.logger import get_logger
+from Attendence.services import archive_service
 
 logger = get_logger(__name__)
 
-@st.cache_data(ttl=60)
-def get_all_classes(supabase=None):
+PURGE_CHUNK_SIZE = 1000
+# Child tables removed by the background purge, with the column used to page through them
+PURGE_TABLES = [("attendance", "id"), ("roll_map", "roll_number")]
+REGISTRY_TTL = 60
+CLASS_PAGE_SIZE = 25
+# Supabase caps each response at 1000 rows; full listings are fetched in pages of this size
+FETCH_PAGE_SIZE = 1000
+CLASS_PAGE_TTL = 30
+
+@cache_resource
+def _class_registry():
+    """
+    Process-wide index of live classes, shared by every session:
+    - by_name: {class_name: settings row}, in name order
+    - open: ordered {class_name: None} of classes taking attendance
+    - version: bumped on every reload or change
+    Mutations in this module swap in updated copies; a full reload every
+    REGISTRY_TTL seconds picks up changes made by other app instances.
+    """
+    return {"lock": threading.Lock(), "by_name": {}, "open": {}, "version": 0, "loaded_at": float("-inf")}
+
+def _fetch_all(build_query, page_size=FETCH_PAGE_SIZE):
+    """Every row of an ordered query, fetched in range() pages under the API's row cap."""
+    rows, start = [], 0
+    while True:
+        page = build_query().range(start, start + page_size - 1).execute().data or []
+        rows += page
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+def _registry(supabase=None):
+    registry = _class_registry()
+    if time.monotonic() - registry["loaded_at"] >= REGISTRY_TTL:
+        _load_registry(supabase)
+    return registry
+
+def _load_registry(supabase=None):
     if not supabase:
         supabase = create_supabase_client()
     try:
-        response = supabase.table("classroom_settings").select("*").execute()
-        return response.data if response.data else []
+        rows = _fetch_all(lambda: supabase.table("classroom_settings").select("*").is_("deleted_at", "null").order("class_name"))
     except Exception:
         logger.exception("Failed to fetch classes")
         raise
+    registry = _class_registry()
+    with registry["lock"]:
+        registry["by_name"] = {row["class_name"]: row for row in rows}
+        registry["open"] = {row["class_name"]: None for row in rows if row.get("is_open")}
+        registry["version"] += 1
+        registry["loaded_at"] = time.monotonic()
+
+def _replace_class(class_name, row):
+    # Copy-on-write: readers iterate whatever snapshot they grabbed, unlocked
+    registry = _class_registry()
+    by_name = dict(registry["by_name"])
+    open_names = dict(registry["open"])
+    if row is None:
+        by_name.pop(class_name, None)
+    else:
+        by_name[class_name] = row
+    if row and row.get("is_open"):
+        open_names[class_name] = None
+    else:
+        open_names.pop(class_name, None)
+    registry["by_name"], registry["open"] = by_name, open_names
+    registry["version"] += 1
+
+def _add_class(row):
+    with _class_registry()["lock"]:
+        _replace_class(row["class_name"], dict(row))
+
+def _update_class(class_name, **fields):
+    registry = _class_registry()
+    with registry["lock"]:
+        row = registry["by_name"].get(class_name)
+        # A class not loaded in this process yet arrives with the next reload
+        if row is not None:
+            _replace_class(class_name, {**row, **fields})
+        else:
+            # Still bump the version: cached class pages are keyed on it
+            registry["version"] += 1
+
+def _remove_class(class_name):
+    with _class_registry()["lock"]:
+        _replace_class(class_name, None)
+
+def refresh_classes():
+    """Marks the registry stale so the next read reloads it from the database."""
+    registry = _class_registry()
+    with registry["lock"]:
+        registry["loaded_at"] = float("-inf")
+
+def get_registry_version():
+    """Changes whenever any class is added, removed or updated."""
+    return _registry()["version"]
+
+def get_all_classes(supabase=None):
+    return [dict(row) for row in _registry(supabase)["by_name"].values()]
+
+def get_class_names(supabase=None):
+    return list(_registry(supabase)["by_name"])
 
-@st.cache_data(ttl=60)
 def get_open_classes(supabase=None):
+    return list(_registry(supabase)["open"])
+
+def get_class_settings(class_name, supabase=None):
+    """Settings row for one class, or None. A dict lookup, no scan."""
+    row = _registry(supabase)["by_name"].get(class_name)
+    return dict(row) if row else None
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _owned_classes_query(supabase, columns, owner_id, include_deleted=False, **select_options):
+    query = supabase.table("classroom_settings")
+    if owner_id is None:
+        query = query.select(columns, **select_options)
+    else:
+        # Inner join on class_owners, filtered in the database through its (user_id, class_name) key
+        query = query.select(f"{columns}, class_owners!inner(user_id)", **select_options).eq("class_owners.user_id", owner_id)
+    return query if include_deleted else query.is_("deleted_at", "null")
+
+def query_class_page(owner_id=None, search=None, page=0, page_size=CLASS_PAGE_SIZE, open_only=False, supabase=None):
+    """
+    One page of the classes `owner_id` may manage (every class for None),
+    ordered by name and optionally filtered by a case-insensitive substring.
+    Returns (rows, total_matching).
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        query = _owned_classes_query(supabase, "*", owner_id, count="exact")
+        if search:
+            query = query.ilike("class_name", f"%{_escape_like(search)}%")
+        if open_only:
+            query = query.eq("is_open", True)
+        start = page * page_size
+        response = query.order("class_name").range(start, start + page_size - 1).execute()
+    except Exception:
+        logger.exception(f"Failed to fetch classes for owner {owner_id}")
+        raise
+    rows = [{k: v for k, v in row.items() if k != "class_owners"} for row in response.data or []]
+    return rows, response.count or 0
+
+@cache_data(ttl=CLASS_PAGE_TTL, show_spinner=False)
+def _fetch_class_page(owner_id, search, page, page_size, open_only, version):
+    return query_class_page(owner_id, search, page, page_size, open_only)
+
+def list_classes(owner_id=None, search=None, page=0, page_size=CLASS_PAGE_SIZE, open_only=False):
+    """Cached `query_class_page`; any class change in this process refreshes it."""
+    # The raw counter, not get_registry_version(): that would load every class
+    version = _class_registry()["version"]
+    return _fetch_class_page(owner_id, search or None, page, page_size, open_only, version)
+
+@cache_data(ttl=CLASS_PAGE_TTL, show_spinner=False)
+def _fetch_owned_class_names(owner_id, include_deleted, version):
+    supabase = create_supabase_client()
+    try:
+        rows = _fetch_all(lambda: _owned_classes_query(supabase, "class_name", owner_id, include_deleted).order("class_name"))
+    except Exception:
+        logger.exception(f"Failed to fetch class names for owner {owner_id}")
+        raise
+    return [row["class_name"] for row in rows]
+
+def list_class_names(owner_id=None, include_deleted=False):
+    """
+    Names of every class `owner_id` may manage (every live class for None).
+    `include_deleted` adds the owner's classes that are still being purged.
+    """
+    if owner_id is None:
+        return get_class_names()
+    return _fetch_owned_class_names(owner_id, include_deleted, _class_registry()["version"])
+
+def owns_class(owner_id, class_name, supabase=None):
+    """True if `owner_id` may manage the class. None (the super admin) owns everything."""
+    if owner_id is None:
+        return True
     if not supabase:
         supabase = create_supabase_client()
     try:
-        response = supabase.table("classroom_settings").select("class_name").eq("is_open", True).execute()
-        return [entry["class_name"] for entry in response.data] if response.data else []
+        rows = supabase.table("class_owners").select("class_name").eq("user_id", owner_id).eq("class_name", class_name).limit(1).execute().data
     except Exception:
-        logger.exception("Failed to fetch open classes")
+        logger.exception(f"Failed to check owner of {class_name}")
         raise
+    return bool(rows)
 
-def create_class(class_name, code="1234", daily_limit=10, supabase=None):
+def assign_owner(class_name, owner_id, supabase=None):
+    """Gives `owner_id` access to the class. Idempotent."""
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        supabase.table("class_owners").upsert(
+            {"class_name": class_name, "user_id": owner_id}, on_conflict="user_id,class_name", ignore_duplicates=True
+        ).execute()
+        registry = _class_registry()
+        with registry["lock"]:
+            registry["version"] += 1
+    except Exception:
+        logger.exception(f"Failed to assign {class_name} to {owner_id}")
+        raise
+
+def create_class(class_name, code="1234", daily_limit=10, owner_id=None, supabase=None):
     if not supabase:
         supabase = create_supabase_client()
     try:
         # Check if exists
-        exists = supabase.table("classroom_settings").select("*").eq("class_name", class_name).execute().data
+        exists = supabase.table("classroom_settings").select("deleted_at").eq("class_name", class_name).execute().data
         if exists:
+            if exists[0].get("deleted_at"):
+                return False, "A class with this name is still being deleted. Try again shortly."
             return False, "Class already exists."
         
-        supabase.table("classroom_settings").insert({
+        row = {
             "class_name": class_name,
             "code": code,
             "daily_limit": daily_limit,
             "is_open": False
-        }).execute()
-        get_all_classes.clear()
+        }
+        response = supabase.table("classroom_settings").insert(row).execute()
+        if owner_id is not None:
+            try:
+                assign_owner(class_name, owner_id, supabase)
+            except Exception as e:
+                # An unowned class is invisible to the admin who created it; undo the insert
+                _discard_class(class_name, supabase)
+                return False, f"Class could not be assigned to you: {e}"
+        _add_class(response.data[0] if response.data else row)
         return True, f"Class '{class_name}' created."
     except Exception as e:
         logger.exception(f"Failed to create class {class_name}")
         return False, str(e)
 
+def _discard_class(class_name, supabase):
+    """Deletes a just-created class that could not be set up. Never raises."""
+    try:
+        supabase.table("classroom_settings").delete(returning="minimal").eq("class_name", class_name).is_("deleted_at", "null").execute()
+    except Exception:
+        # Left for the super admin, who sees every class, to delete by hand
+        logger.exception(f"Failed to roll back creation of {class_name}")
+
 def delete_class(class_name, supabase=None):
+    """
+    Soft-deletes a class: it is hidden from every list immediately, and its
+    attendance/roll_map rows are removed by a background purge.
+    Returns False, starting nothing, if no such class exists (or it is
+    already being deleted).
+    """
+    # Imported here so listing and toggling classes never loads pandas
+    from Attendence.services import attendance_service
+
     if not supabase:
         supabase = create_supabase_client()
     try:
-        supabase.table("attendance").delete().eq("class_name", class_name).execute()
-        supabase.table("roll_map").delete().eq("class_name", class_name).execute()
-        supabase.table("classroom_settings").delete().eq("class_name", class_name).execute()
-        get_all_classes.clear()
-        get_open_classes.clear()
-        return True
+        updated = supabase.table("classroom_settings").update({
+            "deleted_at": datetime.now(timezone.utc).isoformat(),
+            "is_open": False,
+        }).eq("class_name", class_name).is_("deleted_at", "null").execute().data
+        _remove_class(class_name)
+        if not updated:
+            return False
+        attendance_service.invalidate_roll_map(class_name)
     except Exception:
         logger.exception(f"Failed to delete class {class_name}")
         raise
+    start_purge(class_name, supabase)
+    return True
+
+@cache_resource
+def _purge_jobs():
+    # Process-wide progress of background purges: {class_name: {...}}
+    return {"lock": threading.Lock(), "jobs": {}}
+
+def get_purge_jobs():
+    """Snapshot of background purge progress, keyed by class name."""
+    registry = _purge_jobs()
+    with registry["lock"]:
+        return {name: dict(job, deleted=dict(job["deleted"])) for name, job in registry["jobs"].items()}
+
+def start_purge(class_name, supabase=None):
+    """
+    Starts the background purge for a soft-deleted class unless one is running.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    registry = _purge_jobs()
+    with registry["lock"]:
+        job = registry["jobs"].get(class_name)
+        if job and job["status"] == "running":
+            return False
+        registry["jobs"][class_name] = {"status": "running", "deleted": {t: 0 for t, _ in PURGE_TABLES}, "error": None}
+    threading.Thread(target=purge_class, args=(class_name, supabase), name=f"purge-{class_name}", daemon=True).start()
+    return True
+
+def purge_class(class_name, supabase=None, chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Deletes a soft-deleted class's child rows in bounded chunks and its
+    semester archives, then the settings row itself. Every step is idempotent, so a purge interrupted by a
+    crash simply continues from whatever rows remain.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    registry = _purge_jobs()
+    job = registry["jobs"].setdefault(class_name, {"status": "running", "deleted": {t: 0 for t, _ in PURGE_TABLES}, "error": None})
+    try:
+        for table, key in PURGE_TABLES:
+            while True:
+                rows = supabase.table(table).select(key).eq("class_name", class_name).limit(chunk_size).execute().data
+                if not rows:
+                    break
+                supabase.table(table).delete(returning="minimal").eq("class_name", class_name).in_(key, [r[key] for r in rows]).execute()
+                with registry["lock"]:
+                    job["deleted"][table] += len(rows)
+        archived = archive_service.remove_class_archives(class_name, supabase)
+        with registry["lock"]:
+            job["deleted"]["archives"] = archived
+        # Only drop the marker once nothing is left, so a restart can find unfinished purges
+        supabase.table("classroom_settings").delete().eq("class_name", class_name).not_.is_("deleted_at", "null").execute()
+        with registry["lock"]:
+            job["status"] = "done"
+        logger.info(f"Purged class {class_name}: {job['deleted']}")
+    except Exception as e:
+        logger.exception(f"Purge of {class_name} stopped; it will resume on the next attempt")
+        with registry["lock"]:
+            job["status"] = "failed"
+            job["error"] = str(e)
+
+@cache_resource
+def resume_pending_deletions(supabase=None):
+    """
+    Restarts purges left unfinished by a previous process. Cached so it runs
+    once per server process.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        pending = supabase.table("classroom_settings").select("class_name").not_.is_("deleted_at", "null").execute().data or []
+    except Exception:
+        # Not cached on failure, so the next call retries
+        logger.exception("Failed to look up pending deletions")
+        raise
+    for row in pending:
+        start_purge(row["class_name"], supabase)
+    return [row["class_name"] for row in pending]
 
 def update_class_status(class_name, is_open, supabase=None):
     if not supabase:
         supabase = create_supabase_client()
     try:
         supabase.table("classroom_settings").update({"is_open": is_open}).eq("class_name", class_name).execute()
-        get_all_classes.clear()
-        get_open_classes.clear()
+        _update_class(class_name, is_open=is_open)
     except Exception:
         logger.exception(f"Failed to update status for {class_name}")
         raise
 
+def set_classes_status(class_names, is_open, supabase=None):
+    """Opens or closes many classes in a single request."""
+    if not supabase:
+        supabase = create_supabase_client()
+    try:
+        supabase.table("classroom_settings").update({"is_open": is_open}).in_("class_name", list(class_names)).execute()
+        for class_name in class_names:
+            _update_class(class_name, is_open=is_open)
+    except Exception:
+        logger.exception(f"Failed to update status for {len(class_names)} classes")
+        raise
+
 def update_class_settings(class_name, code, daily_limit, supabase=None):
     if not supabase:
         supabase = create_supabase_client()
     try:
         supabase.table("classroom_settings").update({"code": code, "daily_limit": daily_limit}).eq("class_name", class_name).execute()
-        get_all_classes.clear()
+        _update_class(class_name, code=code, daily_limit=daily_limit)
     except Exception:
         logger.exception(f"Failed to update settings for {class_name}")
         raise
@@ -0,0 +1,237 @@
+# Attendence/services/import_service.py
+import re
+import numpy as np
+import pandas as pd
+from Attendence.core.checkpoints import load_checkpoint, save_checkpoint, clear_checkpoint
+from Attendence.core.clients import create_supabase_client
+from Attendence.core.logger import get_logger
+from Attendence.services import attendance_service
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 500
+ATTENDANCE_CHUNK_SIZE = 1000
+DATE_COLUMN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Header spellings accepted for the two roster columns
+ROLL_ALIASES = {"roll_number", "roll", "roll no", "roll_no", "rollno", "roll number"}
+NAME_ALIASES = {"name", "student", "student name", "student_name"}
+
+def read_tabular_file(uploaded_file):
+    """
+    Reads an uploaded CSV or Excel file into a string-typed DataFrame.
+    """
+    filename = getattr(uploaded_file, "name", str(uploaded_file)).lower()
+    if filename.endswith((".xlsx", ".xls")):
+        try:
+            return pd.read_excel(uploaded_file, dtype=str)
+        except ImportError:
+            raise ValueError("Reading Excel files requires `openpyxl`. Upload a CSV instead or install it.")
+    return pd.read_csv(uploaded_file, dtype=str)
+
+def _rename_roster_columns(df):
+    renamed = {}
+    for col in df.columns:
+        key = str(col).strip().lower()
+        if key in ROLL_ALIASES:
+            renamed[col] = "roll_number"
+        elif key in NAME_ALIASES:
+            renamed[col] = "name"
+    return df.rename(columns=renamed)
+
+def parse_roster(raw_df):
+    """
+    Validates and deduplicates a roster.
+    Returns (roster_df, invalid_df, conflicts_df):
+    - roster_df: unique (roll_number, name) rows ready to import
+    - invalid_df: rows with a missing/non-numeric roll number or empty name
+    - conflicts_df: roll numbers listed with more than one name in the file
+    """
+    df = _rename_roster_columns(raw_df)
+    missing = {"roll_number", "name"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    df = df[["roll_number", "name"]].copy()
+    df["name"] = df["name"].fillna("").astype(str).str.strip()
+    rolls = pd.to_numeric(df["roll_number"].astype(str).str.strip(), errors="coerce")
+
+    valid = rolls.notna() & (rolls % 1 == 0) & (rolls > 0) & (df["name"] != "")
+    invalid_df = df[~valid]
+
+    df = df[valid].assign(roll_number=rolls[valid].astype(int))
+    df = df.drop_duplicates()
+
+    names_per_roll = df.groupby("roll_number")["name"].transform("nunique")
+    conflicts_df = df[names_per_roll > 1].sort_values("roll_number")
+    roster_df = df[names_per_roll == 1].sort_values("roll_number").reset_index(drop=True)
+    return roster_df, invalid_df, conflicts_df
+
+def import_roster(class_name, roster_df, chunk_size=CHUNK_SIZE, progress=None, supabase=None):
+    """
+    Upserts a parsed roster into roll_map in chunked batch requests.
+    Roll numbers already locked to a different name are never overwritten;
+    they are returned in the conflict report instead.
+    `progress(done, total)` is called after every chunk.
+    Returns a report dict.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+
+    existing = attendance_service.query_roll_map(class_name, supabase)
+    locked = roster_df["roll_number"].map(existing)
+
+    unchanged = roster_df[locked == roster_df["name"]]
+    conflicts = roster_df[locked.notna() & (locked != roster_df["name"])].assign(locked_name=locked)
+    pending = roster_df[locked.isna()]
+
+    rows = [
+        {"class_name": class_name, "roll_number": int(roll), "name": name}
+        for roll, name in zip(pending["roll_number"], pending["name"])
+    ]
+    total = len(rows)
+    inserted = 0
+    try:
+        for start in range(0, total, chunk_size):
+            chunk = rows[start:start + chunk_size]
+            # ignore_duplicates keeps a concurrent first check-in's lock intact
+            supabase.table("roll_map").upsert(
+                chunk, on_conflict="class_name,roll_number", ignore_duplicates=True, returning="minimal"
+            ).execute()
+            inserted += len(chunk)
+            if progress:
+                progress(inserted, total)
+    except Exception:
+        logger.exception(f"Roster import for {class_name} stopped after {inserted}/{total} rows")
+        raise
+    finally:
+        if inserted:
+            attendance_service.invalidate_roll_map(class_name)
+
+    return {
+        "inserted": inserted,
+        "unchanged": len(unchanged),
+        "conflicts": conflicts[["roll_number", "name", "locked_name"]].reset_index(drop=True),
+    }
+
+def parse_attendance_file(raw_df):
+    """
+    Turns an attendance export into long rows of presence.
+    Accepts the wide matrix `admin_ui` exports (roll_number, name, one P/A column
+    per YYYY-MM-DD date) or a long file with roll_number, name, date and an
+    optional status column.
+    Returns (long_df, invalid_df) where long_df has roll_number, name, date.
+    """
+    df = _rename_roster_columns(raw_df)
+    missing = {"roll_number", "name"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    date_cols = [c for c in df.columns if DATE_COLUMN.match(str(c).strip())]
+    if date_cols:
+        # Wide matrix: locate the 'P' cells with one vectorized comparison
+        # instead of melting every cell into its own row first.
+        statuses = df[date_cols].fillna("").to_numpy(dtype=str)
+        row_idx, col_idx = np.nonzero(np.char.upper(np.char.strip(statuses)) == "P")
+        long_df = pd.DataFrame({
+            "roll_number": df["roll_number"].to_numpy()[row_idx],
+            "name": df["name"].to_numpy()[row_idx],
+            "date": np.asarray([str(c).strip() for c in date_cols])[col_idx],
+        })
+    elif "date" in {str(c).strip().lower() for c in df.columns}:
+        df = df.rename(columns={c: str(c).strip().lower() for c in df.columns if str(c).strip().lower() in ("date", "status")})
+        if "status" in df.columns:
+            df = df[df["status"].fillna("P").astype(str).str.strip().str.upper() == "P"]
+        long_df = df[["roll_number", "name", "date"]].copy()
+    else:
+        raise ValueError("No date columns (YYYY-MM-DD) or `date` column found.")
+
+    long_df["name"] = long_df["name"].fillna("").astype(str).str.strip()
+    long_df["date"] = pd.to_datetime(long_df["date"].astype(str).str.strip(), format="%Y-%m-%d", errors="coerce").dt.strftime("%Y-%m-%d")
+    rolls = pd.to_numeric(long_df["roll_number"].astype(str).str.strip(), errors="coerce")
+
+    valid = rolls.notna() & (rolls % 1 == 0) & (rolls > 0) & (long_df["name"] != "") & long_df["date"].notna()
+    invalid_df = long_df[~valid]
+    long_df = long_df[valid].assign(roll_number=rolls[valid].astype(int))
+    long_df = long_df.drop_duplicates(subset=["roll_number", "date"]).sort_values(["date", "roll_number"]).reset_index(drop=True)
+    return long_df, invalid_df
+
+def _backfill_key(class_name, long_df, chunk_size):
+    fingerprint = int(pd.util.hash_pandas_object(long_df, index=False).sum())
+    return f"backfill:{class_name}:{fingerprint:x}:{chunk_size}"
+
+def backfill_attendance(class_name, long_df, chunk_size=ATTENDANCE_CHUNK_SIZE, dry_run=False, progress=None, supabase=None):
+    """
+    Bulk-loads historical attendance for a class.
+    Roll numbers are mapped first (see `import_roster`), then attendance rows
+    are upserted in chunks keyed on (class_name, roll_number, date), so
+    re-running the same file never duplicates data. Completed chunks are
+    checkpointed and skipped when an interrupted import is run again.
+    With dry_run=True nothing is written; the report shows what would happen.
+    """
+    if not supabase:
+        supabase = create_supabase_client()
+
+    roster_df = long_df[["roll_number", "name"]].drop_duplicates()
+    names_per_roll = roster_df.groupby("roll_number")["name"].transform("nunique")
+    file_conflicts = roster_df[names_per_roll > 1]
+
+    existing = attendance_service.query_roll_map(class_name, supabase)
+    locked = long_df["roll_number"].map(existing)
+    # Rows whose roll is locked to another name, or named inconsistently in the file, are held back
+    blocked = (locked.notna() & (locked != long_df["name"])) | long_df["roll_number"].isin(file_conflicts["roll_number"])
+    rows_df = long_df[~blocked]
+
+    total = len(rows_df)
+    chunks = range(0, total, chunk_size)
+    report = {
+        "rows": total,
+        "students": rows_df["roll_number"].nunique(),
+        "dates": rows_df["date"].nunique(),
+        "first_date": rows_df["date"].min() if total else None,
+        "last_date": rows_df["date"].max() if total else None,
+        "new_students": int(rows_df.loc[locked[~blocked].isna(), "roll_number"].nunique()),
+        "conflicts": (
+            long_df[blocked].drop_duplicates(subset=["roll_number", "name"])[["roll_number", "name"]]
+            .assign(locked_name=lambda d: d["roll_number"].map(existing))
+            .reset_index(drop=True)
+        ),
+        "chunks": len(chunks),
+        "skipped_chunks": 0,
+        "dry_run": dry_run,
+    }
+    if dry_run or not total:
+        return report
+
+    key = _backfill_key(class_name, rows_df, chunk_size)
+    done_chunks = (load_checkpoint(key) or {}).get("done_chunks", 0)
+    report["skipped_chunks"] = done_chunks
+
+    roster_report = import_roster(class_name, rows_df[["roll_number", "name"]].drop_duplicates(), supabase=supabase)
+    report["new_students"] = roster_report["inserted"]
+
+    roll_col = rows_df["roll_number"].to_numpy()
+    name_col = rows_df["name"].to_numpy()
+    date_col = rows_df["date"].to_numpy()
+    for index, start in enumerate(chunks):
+        if index < done_chunks:
+            continue
+        end = start + chunk_size
+        # Build each request body only when it is sent
+        chunk = [
+            {"class_name": class_name, "roll_number": int(roll), "name": name, "date": date}
+            for roll, name, date in zip(roll_col[start:end], name_col[start:end], date_col[start:end])
+        ]
+        try:
+            supabase.table("attendance").upsert(
+                chunk, on_conflict="class_name,roll_number,date", ignore_duplicates=True, returning="minimal"
+            ).execute()
+        except Exception:
+            logger.exception(f"Backfill for {class_name} stopped at chunk {index + 1}/{len(chunks)}")
+            raise
+        save_checkpoint(key, {"class_name": class_name, "done_chunks": index + 1, "total_chunks": len(chunks)})
+        if progress:
+            progress(index + 1, len(chunks))
+
+    clear_checkpoint(key)
+    return report
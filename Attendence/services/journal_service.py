@@ -0,0 +1,278 @@
+# Attendence/services/journal_service.py
+import random
+import sqlite3
+import threading
+import time
+from Attendence.core.cache import cache_resource
+from Attendence.core.clients import create_supabase_client
+from Attendence.core.config import get_env
+from Attendence.core.logger import get_logger
+from Attendence.services import attendance_service
+
+logger = get_logger(__name__)
+
+# Optional local write-ahead journal for check-ins. When SUBMISSION_JOURNAL
+# points at a file, validated submissions are committed to SQLite (WAL) and
+# acknowledged at once; a background thread replays them to Supabase.
+JOURNAL_PATH = get_env("SUBMISSION_JOURNAL")
+REPLAY_BATCH = 200
+MAX_ATTEMPTS = 10
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 300.0
+DONE_RETENTION = 24 * 3600
+
+SCHEMA = """
+create table if not exists submissions (
+    id integer primary key autoincrement,
+    key text not null unique,
+    class_name text not null,
+    roll_number integer not null,
+    name text not null,
+    date text not null,
+    lock_name integer not null default 0,
+    status text not null default 'pending',
+    attempts integer not null default 0,
+    next_attempt real not null default 0,
+    last_error text,
+    created_at real not null,
+    replayed_at real
+);
+create index if not exists submissions_status on submissions (status, id);
+create index if not exists submissions_class_date on submissions (class_name, date, status);
+"""
+
+def journal_enabled():
+    return bool(JOURNAL_PATH)
+
+def submission_key(class_name, roll_number, date):
+    """Idempotency key: one check-in per student per class per day."""
+    return f"{class_name}:{roll_number}:{date}"
+
+@cache_resource
+def _journal():
+    """
+    The process's journal connection (shared under a lock) and its replay
+    thread. Created once; replay also resumes whatever a crashed process left.
+    """
+    conn = sqlite3.connect(JOURNAL_PATH, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("pragma journal_mode=wal")
+    # FULL: an acknowledged check-in survives a power cut, not just a crash
+    conn.execute("pragma synchronous=full")
+    conn.executescript(SCHEMA)
+    # Journals created before roll-map locks were journaled lack the column
+    if "lock_name" not in {row[1] for row in conn.execute("pragma table_info(submissions)")}:
+        conn.execute("alter table submissions add column lock_name integer not null default 0")
+    journal = {"conn": conn, "lock": threading.Lock(), "wake": threading.Event(), "outages": 0}
+    threading.Thread(target=_replay_loop, args=(journal,), name="journal-replay", daemon=True).start()
+    return journal
+
+def start_replay():
+    """Opens the journal and starts replaying, if the journal is enabled."""
+    if journal_enabled():
+        _journal()
+
+def enqueue_submission(class_name, roll_number, name, date, lock_name=False):
+    """
+    Durably records a validated check-in, and with `lock_name` the student's
+    first roll-map lock, replayed ahead of it. Returns False if the same
+    student/class/date is already journaled.
+    """
+    journal = _journal()
+    with journal["lock"]:
+        cursor = journal["conn"].execute(
+            "insert or ignore into submissions (key, class_name, roll_number, name, date, lock_name, created_at) values (?, ?, ?, ?, ?, ?, ?)",
+            (submission_key(class_name, roll_number, date), class_name, roll_number, name, date, int(lock_name), time.time()),
+        )
+    journal["wake"].set()
+    return cursor.rowcount == 1
+
+def pending_rolls(class_name, date):
+    """Roll numbers journaled for the class/date but not yet in the database."""
+    journal = _journal()
+    with journal["lock"]:
+        rows = journal["conn"].execute(
+            "select roll_number from submissions where class_name = ? and date = ? and status != 'done'",
+            (class_name, date),
+        ).fetchall()
+    return {row[0] for row in rows}
+
+def _class_filter(class_names):
+    """SQL condition and arguments limiting rows to `class_names` (None = every class)."""
+    if class_names is None:
+        return "1 = 1", ()
+    class_names = list(class_names)
+    return f"class_name in ({','.join('?' * len(class_names))})", tuple(class_names)
+
+def get_journal_stats(class_names=None):
+    """{status: count} across the journal, or across `class_names` only."""
+    journal = _journal()
+    condition, args = _class_filter(class_names)
+    with journal["lock"]:
+        rows = journal["conn"].execute(f"select status, count(*) from submissions where {condition} group by status", args).fetchall()
+    return dict(rows)
+
+def get_journal_entries(statuses=("pending", "failed"), limit=200, class_names=None):
+    """Oldest entries in the given statuses (and `class_names`, if given), as dicts."""
+    journal = _journal()
+    placeholders = ",".join("?" * len(statuses))
+    condition, args = _class_filter(class_names)
+    with journal["lock"]:
+        cursor = journal["conn"].execute(
+            f"select id, class_name, roll_number, name, date, status, attempts, last_error, created_at "
+            f"from submissions where status in ({placeholders}) and {condition} order by id limit ?",
+            (*statuses, *args, limit),
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def retry_failed(class_names=None):
+    """Puts failed entries (of `class_names`, if given) back in the replay queue. Returns how many."""
+    journal = _journal()
+    condition, args = _class_filter(class_names)
+    with journal["lock"]:
+        cursor = journal["conn"].execute(
+            f"update submissions set status = 'pending', attempts = 0, next_attempt = 0 where status = 'failed' and {condition}",
+            args,
+        )
+    journal["wake"].set()
+    return cursor.rowcount
+
+def _backoff(attempts):
+    delay = min(BASE_BACKOFF * 2 ** attempts, MAX_BACKOFF)
+    return delay * random.uniform(0.8, 1.2)
+
+def _is_data_error(error):
+    """
+    True if the database rejected the rows themselves (a 4xx: bad value, constraint,
+    permission), not a connection failure or 5xx that a later retry can get through.
+    """
+    try:
+        from postgrest.exceptions import APIError
+    except ImportError:
+        return False
+    if not isinstance(error, APIError):
+        return False
+    code = error.code
+    if isinstance(code, int):
+        return 400 <= code < 500
+    # SQLSTATE data exception / integrity constraint / access rule classes, PostgREST request errors
+    return str(code or "").startswith(("22", "23", "42", "PGRST1", "PGRST2"))
+
+def _send_prefix(supabase, rows):
+    """
+    Upserts `rows` in order, halving a request the database rejects to isolate
+    the first bad row. Returns (number of leading rows sent, first bad row or None,
+    error); an outage stops the replay with no bad row but the error set.
+    """
+    try:
+        locks = [{"class_name": c, "roll_number": r, "name": n} for _, c, r, n, _, lock, _, _ in rows if lock]
+        if locks:
+            # An existing lock wins; the roll keeps the name it was first claimed with
+            supabase.table("roll_map").upsert(
+                locks, on_conflict="class_name,roll_number", ignore_duplicates=True, returning="minimal",
+            ).execute()
+        supabase.table("attendance").upsert(
+            [{"class_name": c, "roll_number": r, "name": n, "date": d} for _, c, r, n, d, _, _, _ in rows],
+            on_conflict="class_name,roll_number,date", ignore_duplicates=True, returning="minimal",
+        ).execute()
+        return len(rows), None, None
+    except Exception as e:
+        if not _is_data_error(e):
+            return 0, None, e
+        if len(rows) == 1:
+            return 0, rows[0], e
+    half = len(rows) // 2
+    sent, bad, error = _send_prefix(supabase, rows[:half])
+    if error is not None:
+        return sent, bad, error
+    sent, bad, error = _send_prefix(supabase, rows[half:])
+    return half + sent, bad, error
+
+def _replay_batch(journal, supabase):
+    """
+    Sends the oldest due pending entries in one idempotent upsert.
+    If the database rejects it, the batch is split until the first bad entry is
+    found: the entries before it are done, only it is charged an attempt, and the
+    rest wait behind it. If the database is unreachable, the queue backs off and
+    no entry is charged. Returns True if there may be more work right away.
+    """
+    now = time.time()
+    with journal["lock"]:
+        rows = journal["conn"].execute(
+            "select id, class_name, roll_number, name, date, lock_name, attempts, next_attempt from submissions "
+            "where status = 'pending' order by id limit ?",
+            (REPLAY_BATCH,),
+        ).fetchall()
+    # Replay strictly in arrival order: nothing overtakes an entry that is backing off
+    due = 0
+    while due < len(rows) and rows[due][7] <= now:
+        due += 1
+    rows = rows[:due]
+    if not rows:
+        return False
+
+    sent, bad, error = _send_prefix(supabase, rows)
+    if error is None or bad is not None:
+        # The database answered
+        journal["outages"] = 0
+    done = rows[:sent]
+    if done:
+        ids = [row[0] for row in done]
+        with journal["lock"]:
+            journal["conn"].execute(
+                f"update submissions set status = 'done', replayed_at = ?, last_error = null where id in ({','.join('?' * len(ids))})",
+                (time.time(), *ids),
+            )
+        for class_name in {row[1] for row in done}:
+            attendance_service.invalidate_class_data(class_name)
+
+    if bad is not None:
+        attempts = bad[6] + 1
+        status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+        logger.warning(f"Journal replay of check-in {bad[0]} failed (attempt {attempts}): {error}")
+        with journal["lock"]:
+            journal["conn"].execute(
+                "update submissions set attempts = ?, next_attempt = ?, last_error = ?, status = ? where id = ?",
+                (attempts, time.time() + _backoff(attempts), str(error)[:500], status, bad[0]),
+            )
+        # A failed entry that is done retrying no longer holds back the ones behind it
+        return status == "failed"
+    if error is not None:
+        journal["outages"] += 1
+        waiting = [row[0] for row in rows[sent:]]
+        logger.warning(f"Journal replay paused, database unavailable (try {journal['outages']}): {error}")
+        with journal["lock"]:
+            journal["conn"].execute(
+                f"update submissions set next_attempt = ?, last_error = ? where id in ({','.join('?' * len(waiting))})",
+                (time.time() + _backoff(journal["outages"]), str(error)[:500], *waiting),
+            )
+        return False
+    return due == REPLAY_BATCH
+
+def _next_wakeup(journal):
+    with journal["lock"]:
+        row = journal["conn"].execute("select min(next_attempt) from submissions where status = 'pending'").fetchone()
+    return None if row[0] is None else max(row[0] - time.time(), 0.0)
+
+def _replay_loop(journal):
+    supabase = None
+    last_prune = 0.0
+    while True:
+        # Cleared before the work, so a check-in arriving meanwhile wakes the next wait
+        journal["wake"].clear()
+        try:
+            if supabase is None:
+                supabase = create_supabase_client()
+            while _replay_batch(journal, supabase):
+                pass
+            if time.time() - last_prune > 3600:
+                with journal["lock"]:
+                    journal["conn"].execute(
+                        "delete from submissions where status = 'done' and replayed_at < ?", (time.time() - DONE_RETENTION,)
+                    )
+                last_prune = time.time()
+            timeout = _next_wakeup(journal)
+        except Exception:
+            logger.exception("Journal replay loop error")
+            timeout = BASE_BACKOFF * 5
+        journal["wake"].wait(timeout)
@@ -0,0 +1,166 @@
+# Attendence/services/report_service.py
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Attendence.core.config import get_env
+from Attendence.core.logger import get_logger
+from Attendence.core.utils import current_ist_datetime, safe_filename
+
+logger = get_logger(__name__)
+
+REPORT_DIR = get_env("REPORT_DIR", "reports")
+MANIFEST_NAME = "manifest.json"
+
+def _manifest_path(report_dir):
+    return os.path.join(report_dir, MANIFEST_NAME)
+
+def load_report_manifest(report_dir=REPORT_DIR):
+    """{class_name: {version, generated_at, files, pushed_version}} for the last generated reports."""
+    try:
+        with open(_manifest_path(report_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _save_manifest(report_dir, manifest):
+    os.makedirs(report_dir, exist_ok=True)
+    tmp_path = f"{_manifest_path(report_dir)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _manifest_path(report_dir))
+
+def _write_chart(summary, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (top, bottom) = plt.subplots(2, 1, figsize=(10, 8))
+    per_student = summary["per_student"].sort_values("Attendance %")
+    top.barh(per_student["name"].tail(40), per_student["Attendance %"].tail(40), color="#4B8BBE")
+    top.set_title(f"{summary['class_name']}: attendance % (lowest 40)")
+    top.set_xlim(0, 100)
+    trend = summary["trend"]
+    bottom.plot(trend["date"], trend["present"] / trend["students"] * 100, color="#4CAF50")
+    bottom.set_title("Daily attendance %")
+    bottom.set_ylim(0, 100)
+    bottom.tick_params(axis="x", labelrotation=45, labelsize=7)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+def build_class_report(class_name, report_dir=REPORT_DIR):
+    """
+    Writes one class's matrix.csv, summary.json and chart.png under
+    <report_dir>/<class>/ and returns {file kind: path}.
+    Runs in a worker process, so it does its own imports and queries.
+    """
+    from Attendence.services import analytics_service, attendance_service
+
+    frame = attendance_service.query_attendance_frame(class_name)
+    roster = attendance_service.get_roll_map(class_name)
+    out_dir = os.path.join(report_dir, safe_filename(class_name))
+    os.makedirs(out_dir, exist_ok=True)
+    files = {
+        "matrix": os.path.join(out_dir, "matrix.csv"),
+        "summary": os.path.join(out_dir, "summary.json"),
+        "chart": os.path.join(out_dir, "chart.png"),
+    }
+
+    attendance_service.build_attendance_matrix(frame, roster).to_csv(files["matrix"], index=False)
+
+    summary = analytics_service.summarize_frame(class_name, frame, roster)
+    with open(files["summary"], "w", encoding="utf-8") as f:
+        json.dump({
+            "class_name": class_name,
+            "students": int(summary["students"]),
+            "sessions": int(summary["sessions"]),
+            "overall_pct": float(summary["overall_pct"]),
+            "per_student": summary["per_student"].to_dict("records"),
+            "trend": summary["trend"].to_dict("records"),
+        }, f, indent=2, default=int)
+
+    if summary["students"]:
+        _write_chart(summary, files["chart"])
+    else:
+        files.pop("chart")
+    return files
+
+def generate_reports(class_names=None, report_dir=REPORT_DIR, max_workers=None, force=False, push=False, progress=None):
+    """
+    Builds reports for many classes in parallel worker processes.
+    Classes whose data version matches the last run are skipped unless
+    `force`. With `push`, each new matrix also goes to the GitHub export, and
+    an up-to-date matrix whose last push failed is pushed again; a class whose
+    push fails is reported as failed. `progress(done, total)` is called as
+    classes finish. Returns {"generated": [...], "pushed": [...],
+    "skipped": [...], "failed": {class: error}}.
+    """
+    from Attendence.services import attendance_service, class_service, github_service
+
+    if class_names is None:
+        class_names = class_service.get_class_names()
+    manifest = load_report_manifest(report_dir)
+    result = {"generated": [], "pushed": [], "skipped": [], "failed": {}}
+
+    versions, pending, unpushed = {}, [], []
+    for name in class_names:
+        try:
+            versions[name] = attendance_service.query_class_data_version(name)
+        except Exception as e:
+            result["failed"][name] = str(e)
+            continue
+        entry = manifest.get(name, {})
+        if force or entry.get("version") != versions[name]:
+            pending.append(name)
+        elif push and entry.get("pushed_version") != versions[name]:
+            # The report is current, but its matrix never reached GitHub
+            unpushed.append(name)
+        else:
+            result["skipped"].append(name)
+
+    if pending:
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending)))
+        # spawn, not fork: the parent may be a threaded Streamlit server
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(build_class_report, name, report_dir): name for name in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                try:
+                    files = future.result()
+                except Exception as e:
+                    logger.exception(f"Report for {name} failed")
+                    result["failed"][name] = str(e)
+                else:
+                    manifest[name] = {
+                        "version": versions[name],
+                        "generated_at": current_ist_datetime().isoformat(),
+                        "files": files,
+                        "pushed_version": manifest.get(name, {}).get("pushed_version"),
+                    }
+                    result["generated"].append(name)
+                    # Saved after every class, so an interrupted run keeps its progress
+                    _save_manifest(report_dir, manifest)
+                if progress:
+                    progress(done, len(pending))
+
+    if push:
+        for name in result["generated"] + unpushed:
+            try:
+                with open(manifest[name]["files"]["matrix"], "r", encoding="utf-8") as f:
+                    ok, msg = github_service.push_attendance_matrix(name, f.read())
+            except OSError as e:
+                ok, msg = False, str(e)
+            if not ok:
+                result["failed"][name] = msg
+                if name in result["generated"]:
+                    result["generated"].remove(name)
+                continue
+            manifest[name]["pushed_version"] = versions[name]
+            result["pushed"].append(name)
+            _save_manifest(report_dir, manifest)
+
+    logger.info(
+        f"Reports: {len(result['generated'])} generated, {len(result['pushed'])} pushed, {len(result['skipped'])} unchanged, {len(result['failed'])} failed"
+    )
+    return result
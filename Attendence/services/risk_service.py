@@ -0,0 +1,149 @@
+# Attendence/services/risk_service.py
+import threading
+import pandas as pd
+from Attendence.core.cache import cache_resource
+from Attendence.core.logger import get_logger
+from Attendence.services import attendance_service
+
+logger = get_logger(__name__)
+
+WINDOW_SESSIONS = 10
+STREAK_ALERT = 3
+DEFAULT_TERM_SESSIONS = 40
+
+WATCH_COLUMNS = ["roll_number", "name", "Attendance %", "Recent %", "Absence Streak", "Projected %"]
+
+class StudentRisk:
+    __slots__ = ("name", "present", "streak", "window")
+
+    def __init__(self, name, present=0, streak=0, window=0):
+        self.name = name
+        self.present = present
+        self.streak = streak
+        # Bit i set = present in the i-th most recent session (bit 0 = latest)
+        self.window = window
+
+class RiskState:
+    """
+    Running attendance state for one class's current term (hot table only).
+    Rows are applied in (date, id) order: the first row of a new date opens a
+    session, which costs O(students); every other row costs O(1).
+    """
+    def __init__(self, window=WINDOW_SESSIONS):
+        self.lock = threading.Lock()
+        self.window = window
+        self.mask = (1 << window) - 1
+        self.reset()
+
+    def reset(self):
+        self.students = {}
+        self.sessions = 0
+        self.last_date = None
+        self.last_id = 0
+        self.rows = 0
+        self.version = None
+
+    def _open_session(self, date):
+        for student in self.students.values():
+            student.window = (student.window << 1) & self.mask
+            student.streak += 1
+        self.sessions += 1
+        self.last_date = date
+
+    def apply(self, row):
+        """Applies one attendance row. Returns False if it predates the latest session."""
+        date = row["date"]
+        if self.last_date is None or date > self.last_date:
+            self._open_session(date)
+        elif date < self.last_date:
+            return False
+
+        roll_number = int(row["roll_number"])
+        student = self.students.get(roll_number)
+        if student is None:
+            # Unknown until now: absent from every session so far
+            student = self.students[roll_number] = StudentRisk(row["name"], streak=self.sessions)
+        if not student.window & 1:
+            student.present += 1
+            student.window |= 1
+            student.streak = 0
+        self.rows += 1
+        self.last_id = max(self.last_id, row["id"])
+        return True
+
+    def enroll(self, roster):
+        """Adds roster students ({roll_number: name}) not seen yet, absent from every session so far."""
+        for roll_number, name in roster.items():
+            if roll_number not in self.students:
+                self.students[roll_number] = StudentRisk(name, streak=self.sessions)
+
+@cache_resource
+def _risk_states():
+    # Process-wide: {class_name: RiskState}
+    return {"lock": threading.Lock(), "classes": {}}
+
+def _state(class_name):
+    states = _risk_states()
+    with states["lock"]:
+        return states["classes"].setdefault(class_name, RiskState())
+
+def _rebuild(state, class_name, supabase):
+    state.reset()
+    rows = attendance_service.query_records_after(class_name, 0, supabase)
+    for row in sorted(rows, key=lambda r: (r["date"], r["id"])):
+        state.apply(row)
+
+def sync_class(class_name, supabase=None):
+    """
+    Brings the class's risk state up to date and returns it.
+    Only rows newer than the last one seen are fetched. Back-dated imports
+    or deletions (archiving, purges) are detected and trigger a full rebuild.
+    """
+    state = _state(class_name)
+    with state.lock:
+        version = attendance_service.get_class_data_version(class_name)
+        if version == state.version:
+            return state
+
+        in_order = True
+        for row in attendance_service.query_records_after(class_name, state.last_id, supabase):
+            if not state.apply(row):
+                in_order = False
+                break
+
+        count, latest_id = (int(part) for part in attendance_service.query_class_data_version(class_name, supabase).split(":"))
+        if not in_order or (latest_id == state.last_id and count != state.rows) or latest_id < state.last_id:
+            logger.info(f"Rebuilding risk state for {class_name}")
+            _rebuild(state, class_name, supabase)
+        # Students who never checked in exist only in the roll map
+        state.enroll(attendance_service.get_roll_map(class_name, supabase))
+        # Keyed on the fresh marker; rows that landed meanwhile are picked up next time
+        state.version = version if latest_id == state.last_id else None
+        return state
+
+def get_watch_list(class_name, threshold=75.0, term_sessions=DEFAULT_TERM_SESSIONS, streak_alert=STREAK_ALERT, supabase=None):
+    """
+    Students who are below `threshold`, projected to finish below it, or on an
+    absence streak of `streak_alert` or more, most at risk first.
+    The projection assumes each remaining session (up to `term_sessions`) is
+    attended at the student's recent rate over the last WINDOW_SESSIONS.
+    Returns (watch_df, sessions_held).
+    """
+    state = sync_class(class_name, supabase)
+    with state.lock:
+        sessions = state.sessions
+        students = [(roll, s.name, s.present, s.streak, s.window.bit_count()) for roll, s in state.students.items()]
+    if not sessions or not students:
+        return pd.DataFrame(columns=WATCH_COLUMNS), sessions
+
+    df = pd.DataFrame(students, columns=["roll_number", "name", "present", "Absence Streak", "recent"])
+    recent_sessions = min(sessions, state.window)
+    recent_rate = df["recent"] / recent_sessions
+    remaining = max(term_sessions - sessions, 0)
+    df["Attendance %"] = (df["present"] / sessions * 100).round(2)
+    df["Recent %"] = (recent_rate * 100).round(2)
+    df["Projected %"] = ((df["present"] + recent_rate * remaining) / (sessions + remaining) * 100).round(2)
+
+    at_risk = (df["Attendance %"] < threshold) | (df["Projected %"] < threshold) | (df["Absence Streak"] >= streak_alert)
+    watch = df[at_risk].sort_values(["Projected %", "Absence Streak"], ascending=[True, False])
+    return watch[WATCH_COLUMNS].reset_index(drop=True), sessions
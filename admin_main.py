@@ -22,19 +22,22 @@ st.markdown(
 if "admin_logged_in" not in st.session_state:
     st.session_state.admin_logged_in = False
 
-admin_tab, analytics_tab , chatbot_tab = st.tabs(["🧑‍🏫 Admin Panel", "📊 Analytics", "🤖 Chatbot"])
+# Explicit page router: unlike st.tabs, only the selected panel runs on a rerun
+PAGES = ["🧑‍🏫 Admin Panel", "📊 Analytics", "🤖 Chatbot"]
 
-with admin_tab:
+page = st.radio("Section", PAGES, horizontal=True, key="admin_page", label_visibility="collapsed")
+
+if page == "🧑‍🏫 Admin Panel":
     show_admin_panel()
 
-with analytics_tab:
+elif page == "📊 Analytics":
     if st.session_state.admin_logged_in:
         show_analytics_panel()
     else:
-        st.info("🔒 Please login in the 'Admin Panel' tab to view Analytics.")
+        st.info("🔒 Please login in the 'Admin Panel' section to view Analytics.")
 
-with chatbot_tab:
+elif page == "🤖 Chatbot":
     if st.session_state.admin_logged_in:
         show_chatbot_panel()
     else:
-        st.info("🔒 Please login in the 'Admin Panel' tab to use the Chatbot.")
+        st.info("🔒 Please login in the 'Admin Panel' section to use the Chatbot.")
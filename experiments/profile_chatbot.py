@@ -0,0 +1,85 @@
+# experiments/profile_chatbot.py
+"""
+Profiles the chatbot pipeline offline with a deterministic fake LLM.
+
+Run from the repository root (the few-shot prompt is read from Prompts/):
+
+    python experiments/profile_chatbot.py --students 300 --sessions 60 --rounds 5
+
+Prints mean/p95 seconds per graph node and the token usage per question, so
+prompt or node changes can be compared without network calls or API keys.
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Attendence.services import chatbot_service  # noqa: E402
+
+QUESTIONS = [
+    "How many students are there?",
+    "What is the total number of classes?",
+    "Who was present on {first}?",
+    "Who was absent on {last}?",
+    "Count how many students were present on {last}.",
+    "What is the attendance percentage of {name}?",
+    "List students with 100% attendance.",
+    "Who has less than 75% attendance?",
+    "Which date had the highest attendance?",
+    "Which date had the lowest attendance?",
+]
+
+def synthetic_matrix(students, sessions, seed=7):
+    rng = np.random.default_rng(seed)
+    start = date(2024, 1, 1)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(sessions)]
+    present = rng.random((students, sessions)) < 0.8
+    df = pd.DataFrame(np.where(present, "P", "A"), columns=dates)
+    # The first student shares the few-shot example's name so FakeLLM can answer about them
+    df.insert(0, "name", ["John Doe"] + [f"Student {i}" for i in range(2, students + 1)])
+    df.insert(0, "roll_number", range(1, students + 1))
+    return df, dates
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    chatbot_service.set_llm(chatbot_service.FakeLLM())
+    df, dates = synthetic_matrix(args.students, args.sessions)
+    context_key = ("profile", dates[0], dates[-1], len(df), args.sessions)
+    chatbot_service.prepare_class_context(context_key, df)
+
+    questions = [q.format(first=dates[0], last=dates[-1], name="John Doe") for q in QUESTIONS]
+    timings, tokens = {}, {"prompt": 0, "completion": 0, "llm_calls": 0}
+    runs = 0
+    for _ in range(args.rounds):
+        for question in questions:
+            result = chatbot_service.ask(question, context_key)
+            metrics = result["metrics"]
+            for node, seconds in metrics["timings"].items():
+                timings.setdefault(node, []).append(seconds)
+            tokens["prompt"] += metrics["prompt_tokens"]
+            tokens["completion"] += metrics["completion_tokens"]
+            tokens["llm_calls"] += metrics["llm_calls"]
+            runs += 1
+
+    print(f"{runs} questions, {len(df)} students x {args.sessions} sessions\n")
+    print(f"{'node':<15}{'mean ms':>10}{'p95 ms':>10}")
+    for node, values in timings.items():
+        values = np.asarray(values) * 1000
+        print(f"{node:<15}{values.mean():>10.2f}{np.percentile(values, 95):>10.2f}")
+    print(
+        f"\ntokens/question: {tokens['prompt'] / runs:.0f} prompt, "
+        f"{tokens['completion'] / runs:.0f} completion, {tokens['llm_calls'] / runs:.2f} LLM calls"
+    )
+
+if __name__ == "__main__":
+    main()
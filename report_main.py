@@ -0,0 +1,35 @@
+# report_main.py
+# Batch report job: builds matrix, summary and chart for every class.
+# Run from cron, e.g. every Friday at 18:00:
+#   0 18 * * 5  cd /path/to/app && python report_main.py --push
+import argparse
+import sys
+from Attendence.services.report_service import REPORT_DIR, generate_reports
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate per-class attendance reports.")
+    parser.add_argument("--classes", nargs="+", help="only these classes (default: all)")
+    parser.add_argument("--report-dir", default=REPORT_DIR, help=f"output directory (default: {REPORT_DIR})")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild classes whose data has not changed")
+    parser.add_argument("--push", action="store_true", help="also push each new matrix to the GitHub export")
+    args = parser.parse_args(argv)
+
+    result = generate_reports(
+        class_names=args.classes,
+        report_dir=args.report_dir,
+        max_workers=args.workers,
+        force=args.force,
+        push=args.push,
+        progress=lambda done, total: print(f"[{done}/{total}] reports built", flush=True),
+    )
+    print(
+        f"Generated: {len(result['generated'])}, pushed: {len(result['pushed'])}, "
+        f"unchanged: {len(result['skipped'])}, failed: {len(result['failed'])}"
+    )
+    for name, error in result["failed"].items():
+        print(f"  {name}: {error}", file=sys.stderr)
+    return 1 if result["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,4 +12,7 @@ setup(
     author="dmt",
     packages=find_packages(),
     install_requires = requirements,
+    entry_points={
+        "console_scripts": ["attendance-admin=Attendence.cli:main"],
+    },
 )
\ No newline at end of file
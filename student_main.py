@@ -2,7 +2,6 @@
 import streamlit as st
 from Attendence.components.student_ui import show_student_panel, show_view_attendance_panel
 from Attendence.services.class_service import get_all_classes
-from Attendence.services.attendance_service import fetch_attendance_records
 import pandas as pd
 
 st.set_page_config(
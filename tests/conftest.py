@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Makes the Attendence package importable when pytest runs from any directory.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
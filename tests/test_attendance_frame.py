@@ -0,0 +1,130 @@
+# tests/test_attendance_frame.py
+# The typed frame and NumPy-grid matrix must match a plain pandas pivot.
+import random
+import pandas as pd
+import pytest
+from Attendence.services import attendance_service
+from Attendence.services.attendance_service import (
+    FRAME_COLUMNS, _type_frame, build_attendance_matrix, days_to_iso, iso_to_day,
+)
+
+DATES = ["2024-01-01", "2024-01-02", "2024-01-05", "2024-02-29", "2024-03-01"]
+
+def _records(seed=7, students=30):
+    rng = random.Random(seed)
+    records, next_id = [], 1
+    for date in DATES:
+        for roll in range(1, students + 1):
+            if rng.random() < 0.7:
+                # A few students typed their name differently on one day
+                name = f"Student {roll}" if rng.random() < 0.95 else f"student {roll}"
+                records.append({"id": next_id, "roll_number": roll, "name": name, "date": date})
+                next_id += 1
+    rng.shuffle(records)
+    return records
+
+def _naive_matrix(records):
+    df = pd.DataFrame(records)
+    pivot = df.pivot_table(index=["roll_number", "name"], columns="date", values="id", aggfunc="count", fill_value=0)
+    pivot = pivot.map(lambda n: "P" if n else "A").reset_index()
+    pivot.columns.name = None
+    return pivot
+
+def test_type_frame_columns_and_dtypes():
+    frame = _type_frame(pd.DataFrame(_records(), columns=FRAME_COLUMNS))
+    assert list(frame.columns) == ["id", "roll_number", "name", "day"]
+    assert frame["roll_number"].dtype == "int32"
+    assert frame["day"].dtype == "int32"
+    assert isinstance(frame["name"].dtype, pd.CategoricalDtype)
+
+def test_day_ordinals_round_trip():
+    assert days_to_iso([iso_to_day(d) for d in DATES]) == DATES
+    frame = _type_frame(pd.DataFrame(_records(), columns=FRAME_COLUMNS))
+    assert sorted(set(days_to_iso(frame["day"].unique()))) == DATES
+
+def test_type_frame_drops_rows_without_a_numeric_roll():
+    raw = pd.DataFrame(
+        [(1, "7", "A", DATES[0]), (2, "abc", "B", DATES[0]), (3, None, "C", DATES[1]), (4, 9, "D", DATES[1])],
+        columns=FRAME_COLUMNS,
+    )
+    frame = _type_frame(raw)
+    assert frame["roll_number"].tolist() == [7, 9]
+    assert frame["name"].astype(str).tolist() == ["A", "D"]
+    assert days_to_iso(frame["day"]) == [DATES[0], DATES[1]]
+
+def test_empty_input():
+    assert _type_frame(pd.DataFrame(columns=FRAME_COLUMNS)).empty
+    assert list(build_attendance_matrix([]).columns) == ["roll_number", "name"]
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_matrix_matches_naive_pivot(seed):
+    records = _records(seed)
+    expected = _naive_matrix(records)
+    frame = _type_frame(pd.DataFrame(records, columns=FRAME_COLUMNS))
+    for data in (frame, records):
+        pd.testing.assert_frame_equal(build_attendance_matrix(data), expected, check_dtype=False)
+
+def test_roster_adds_absent_students_in_roll_order():
+    records = _records()
+    seen = {r["roll_number"] for r in records}
+    roster = {roll: f"Student {roll}" for roll in range(1, 36)}
+    matrix = build_attendance_matrix(records, roster)
+
+    assert matrix["roll_number"].is_monotonic_increasing
+    assert set(matrix["roll_number"]) == seen | set(roster)
+    absent = matrix[~matrix["roll_number"].isin(seen)]
+    assert absent["roll_number"].tolist() == [roll for roll in range(1, 36) if roll not in seen]
+    assert (absent[DATES] == "A").all().all()
+    # Students already in the data are untouched
+    present = matrix[matrix["roll_number"].isin(seen)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(present, _naive_matrix(records), check_dtype=False)
+
+class FakeCsvQuery:
+    def __init__(self, csv_rows):
+        self.csv_rows = csv_rows
+        self.bounds = None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, *_):
+        return self
+
+    def gte(self, *_):
+        return self
+
+    def lte(self, *_):
+        return self
+
+    def order(self, *_):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def csv(self):
+        return self
+
+    def execute(self):
+        start, end = self.bounds
+        header = ",".join(FRAME_COLUMNS)
+        body = "\n".join(self.csv_rows[start:end + 1])
+        return type("Response", (), {"data": header + ("\n" + body if body else "")})()
+
+class FakeSupabase:
+    def __init__(self, records):
+        self.query = FakeCsvQuery([f"{r['id']},{r['roll_number']},{r['name']},{r['date']}" for r in records])
+
+    def table(self, _):
+        return self.query
+
+def test_query_attendance_frame_pages_past_the_row_cap(monkeypatch):
+    monkeypatch.setattr(attendance_service, "PAGE_SIZE", 40)
+    monkeypatch.setattr(attendance_service.archive_service, "read_archived_frame", lambda *_: None)
+    records = sorted(_records(), key=lambda r: r["id"])
+    assert len(records) > 2 * 40
+
+    frame = attendance_service.query_attendance_frame("CS101", supabase=FakeSupabase(records))
+    assert frame["id"].tolist() == [r["id"] for r in records]
+    pd.testing.assert_frame_equal(build_attendance_matrix(frame), _naive_matrix(records), check_dtype=False)
@@ -0,0 +1,80 @@
+# tests/test_chatbot_service.py
+# Runs the chatbot graph offline on FakeLLM: answers and plan-cache reuse.
+import os
+import pandas as pd
+import pytest
+from conftest import ROOT
+from Attendence.services import chatbot_service
+
+DATES = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+ROWS = [
+    (1, "John Doe", "PAPP"),
+    (2, "Student 2", "PAPA"),
+    (3, "Student 3", "PPPP"),
+    (4, "Student 4", "PPPP"),
+    (5, "Student 5", "APPA"),
+]
+
+def _matrix():
+    df = pd.DataFrame([list(marks) for _, _, marks in ROWS], columns=DATES)
+    df.insert(0, "name", [name for _, name, _ in ROWS])
+    df.insert(0, "roll_number", [roll for roll, _, _ in ROWS])
+    return df
+
+@pytest.fixture
+def context_key(monkeypatch):
+    with open(os.path.join(ROOT, "Prompts", "few_shot_prompt.txt"), encoding="utf-8") as f:
+        examples = f.read()
+    monkeypatch.setitem(chatbot_service._llm, "provider", chatbot_service.FakeLLM(examples))
+    monkeypatch.setitem(chatbot_service._llm, "ready", True)
+    monkeypatch.setattr(chatbot_service, "_plans", type(chatbot_service._plans)())
+    key = ("tests", DATES[0], DATES[-1], len(ROWS))
+    chatbot_service.prepare_class_context(key, _matrix())
+    return key
+
+@pytest.mark.parametrize("question, answer", [
+    ("How many students are there?", "Result: 5"),
+    ("What is the total number of classes?", "Result: 4"),
+    ("Who was absent on 2024-01-04?", "Result: ['Student 2', 'Student 5']"),
+    ("Count how many students were present on 2024-01-04.", "Result: 3"),
+    ("What is the attendance percentage of John Doe?", "Result: 75.0"),
+    ("List students with 100% attendance.", "Result: ['Student 3', 'Student 4']"),
+    ("Which date had the highest attendance?", "Result: 2024-01-03"),
+])
+def test_answers(context_key, question, answer):
+    result = chatbot_service.ask(question, context_key)
+    assert result["answer"] == answer
+    assert result["metrics"]["llm_calls"] == 2
+
+def test_same_template_reuses_plan(context_key):
+    first = chatbot_service.ask("Who was absent on 2024-01-04?", context_key)
+    assert not first["plan_hit"]
+
+    second = chatbot_service.ask("Who was absent on 2024-01-01?", context_key)
+    assert second["plan_hit"]
+    assert second["answer"] == "Result: ['Student 5']"
+    # Only the summary goes to the LLM
+    assert second["metrics"]["llm_calls"] == 1
+
+def test_plan_reuse_with_name_slot(context_key):
+    chatbot_service.ask("What is the attendance percentage of John Doe?", context_key)
+    result = chatbot_service.ask("What is the attendance percentage of Student 3?", context_key)
+    assert result["plan_hit"]
+    assert result["answer"] == "Result: 100.0"
+
+def test_failing_plan_is_regenerated(context_key):
+    chatbot_service.ask("Who was absent on 2024-01-04?", context_key)
+    template, _ = chatbot_service.templatize_question("Who was absent on 2024-01-01?", chatbot_service.get_class_context(context_key))
+    assert chatbot_service.lookup_plan(template) is not None
+    # A cached plan that now fails is dropped and the code regenerated through the LLM
+    broken = chatbot_service.build_plan("df['missing_column']", {})
+    assert broken is not None
+    chatbot_service.store_plan(template, broken)
+
+    result = chatbot_service.ask("Who was absent on 2024-01-01?", context_key)
+    assert result["answer"] == "Result: ['Student 5']"
+    assert result["metrics"]["llm_calls"] == 2
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        chatbot_service.LLMProvider()
@@ -0,0 +1,110 @@
+# tests/test_class_service.py
+# Class creation and deletion against an in-memory stand-in for Supabase.
+import pytest
+from Attendence.services import class_service
+
+class FakeQuery:
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+        self.op, self.payload, self.filters, self.bounds = "select", None, [], None
+
+    def select(self, *_):
+        return self
+
+    def insert(self, row):
+        self.op, self.payload = "insert", row
+        return self
+
+    def upsert(self, row, **_):
+        self.op, self.payload = "upsert", row
+        return self
+
+    def update(self, fields, **_):
+        self.op, self.payload = "update", fields
+        return self
+
+    def delete(self, **_):
+        self.op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda row: row.get(column) is None)
+        return self
+
+    def order(self, *_):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def execute(self):
+        if self.name in self.db.failing:
+            raise ConnectionError(f"{self.name} unavailable")
+        table = self.db.tables.setdefault(self.name, [])
+        if self.op in ("insert", "upsert"):
+            table.append(dict(self.payload))
+            return type("Response", (), {"data": [dict(self.payload)]})()
+        matched = [row for row in table if all(f(row) for f in self.filters)]
+        if self.op == "update":
+            for row in matched:
+                row.update(self.payload)
+        elif self.op == "delete":
+            self.db.tables[self.name] = [row for row in table if row not in matched]
+        if self.bounds:
+            matched = matched[slice(*self.bounds)]
+        return type("Response", (), {"data": [dict(row) for row in matched]})()
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables, self.failing = {}, set()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+@pytest.fixture
+def db(monkeypatch):
+    class_service._class_registry.clear()
+    db = FakeSupabase()
+    monkeypatch.setattr(class_service, "create_supabase_client", lambda: db)
+    yield db
+    class_service._class_registry.clear()
+
+def test_create_class_assigns_the_owner(db):
+    ok, _ = class_service.create_class("Math", owner_id="u1", supabase=db)
+    assert ok
+    assert db.tables["class_owners"] == [{"class_name": "Math", "user_id": "u1"}]
+    assert "Math" in class_service.get_class_names(db)
+
+def test_create_class_rolls_back_when_the_owner_cannot_be_assigned(db):
+    db.failing.add("class_owners")
+    ok, message = class_service.create_class("Math", owner_id="u1", supabase=db)
+    assert not ok
+    assert "could not be assigned" in message
+    assert db.tables["classroom_settings"] == []
+    assert "Math" not in class_service.get_class_names(db)
+
+    # The name is free again once the owner table is back
+    db.failing.clear()
+    assert class_service.create_class("Math", owner_id="u1", supabase=db)[0]
+
+def test_delete_class_soft_deletes_and_starts_the_purge(db, monkeypatch):
+    purged = []
+    monkeypatch.setattr(class_service, "start_purge", lambda name, supabase=None: purged.append(name))
+    from Attendence.services import attendance_service
+    monkeypatch.setattr(attendance_service, "invalidate_roll_map", lambda name: None)
+    class_service.create_class("Math", supabase=db)
+
+    assert class_service.delete_class("Math", supabase=db)
+    assert db.tables["classroom_settings"][0]["deleted_at"]
+    assert "Math" not in class_service.get_class_names(db)
+    assert purged == ["Math"]
+
+    # Unknown or already deleted: nothing matched, nothing purged
+    assert not class_service.delete_class("Physics", supabase=db)
+    assert not class_service.delete_class("Math", supabase=db)
+    assert purged == ["Math"]
@@ -0,0 +1,43 @@
+# tests/test_codes.py
+import pytest
+from Attendence.core import codes
+
+AT = 1_700_000_015.0  # 15 s into a 30 s window
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setenv("ATTENDANCE_CODE_SECRET", "test-secret")
+
+def test_code_shape_and_stability():
+    code = codes.current_code("Math", AT)
+    assert len(code) == codes.CODE_DIGITS and code.isdigit()
+    assert codes.current_code("Math", AT + 10) == code
+
+def test_codes_differ_per_class_and_window():
+    assert codes.current_code("Math", AT) != codes.current_code("Physics", AT)
+    assert codes.current_code("Math", AT) != codes.current_code("Math", AT + codes.CODE_WINDOW_SECONDS)
+
+def test_verify_accepts_skew_windows_only():
+    window = codes.CODE_WINDOW_SECONDS
+    assert codes.verify_code("Math", codes.current_code("Math", AT), at=AT)
+    assert codes.verify_code("Math", codes.current_code("Math", AT - window), at=AT)
+    assert codes.verify_code("Math", codes.current_code("Math", AT + window), at=AT)
+    assert not codes.verify_code("Math", codes.current_code("Math", AT - 2 * window), at=AT)
+    assert codes.verify_code("Math", codes.current_code("Math", AT), at=AT, skew=0)
+
+def test_verify_rejects_other_class_code():
+    assert not codes.verify_code("Physics", codes.current_code("Math", AT), at=AT, skew=0)
+
+@pytest.mark.parametrize("code", ["", None, "12345", "1234567", "12a456", "１２３４５６", "١٢٣٤٥٦"])
+def test_verify_rejects_malformed_codes(code):
+    assert codes.verify_code("Math", code, at=AT) is False
+
+def test_surrounding_whitespace_is_ignored():
+    assert codes.verify_code("Math", f"  {codes.current_code('Math', AT)}\n", at=AT)
+
+def test_disabled_without_secret(monkeypatch):
+    monkeypatch.delenv("ATTENDANCE_CODE_SECRET")
+    assert not codes.rotating_codes_enabled()
+    assert codes.verify_code("Math", "123456", at=AT) is False
+    with pytest.raises(RuntimeError):
+        codes.current_code("Math", AT)
@@ -0,0 +1,42 @@
+# tests/test_date_resolver.py
+from datetime import date
+import pytest
+from Attendence.core.date_resolver import find_date_phrases, resolve_date_phrase
+
+TODAY = "2026-10-21"  # a Wednesday
+
+@pytest.mark.parametrize("question, phrases", [
+    ("who was absent monday", ["monday"]),
+    ("who was absent on friday?", ["on friday"]),
+    ("attendance last Monday", ["last Monday"]),
+    ("who comes next tuesday", ["next tuesday"]),
+    ("compare Monday and Friday", ["Monday", "Friday"]),
+    ("present yesterday and 3 days ago", ["yesterday", "3 days ago"]),
+    ("who was present on 2024-01-05", ["2024-01-05"]),
+    ("how many students are there", []),
+])
+def test_find_date_phrases(question, phrases):
+    assert find_date_phrases(question) == phrases
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("today", date(2026, 10, 21)),
+    ("yesterday", date(2026, 10, 20)),
+    ("tomorrow", date(2026, 10, 22)),
+    ("2 days ago", date(2026, 10, 19)),
+    ("3 days after", date(2026, 10, 24)),
+    ("2024-01-05", date(2024, 1, 5)),
+    ("monday", date(2026, 10, 19)),
+    ("wednesday", date(2026, 10, 21)),
+    ("on wednesday", date(2026, 10, 21)),
+    ("on thursday", date(2026, 10, 15)),
+    ("last wednesday", date(2026, 10, 14)),
+    ("last monday", date(2026, 10, 19)),
+    ("next wednesday", date(2026, 10, 28)),
+    ("next friday", date(2026, 10, 23)),
+    ("  Last   MONDAY ", date(2026, 10, 19)),
+])
+def test_resolve_date_phrase(phrase, expected):
+    assert resolve_date_phrase(phrase, TODAY) == expected
+
+def test_invalid_iso_date_resolves_to_none():
+    assert resolve_date_phrase("2024-02-30", TODAY) is None
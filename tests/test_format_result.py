@@ -0,0 +1,90 @@
+# tests/test_format_result.py
+import numpy as np
+import pandas as pd
+from Attendence.services.chatbot_service import (
+    RESULT_INLINE_CHARS, RESULT_TOP_N, TABLE_MIN_ROWS, TABLE_PREVIEW_ROWS, format_result,
+)
+
+def test_scalars_go_in_verbatim():
+    assert format_result(42) == ("42", None)
+    assert format_result(np.float64(87.5)) == ("87.5", None)
+    assert format_result("John Doe") == ("John Doe", None)
+
+def test_long_text_is_truncated():
+    text, table = format_result("x" * (RESULT_INLINE_CHARS + 100))
+    assert table is None
+    assert text.startswith("x" * RESULT_INLINE_CHARS)
+    assert text.endswith(f"({RESULT_INLINE_CHARS + 100} characters in total)")
+
+def test_short_list_goes_in_verbatim():
+    assert format_result([1, 2, 3]) == ("[1, 2, 3]", None)
+    assert format_result(np.array([4, 5])) == ("[4, 5]", None)
+
+def test_long_list_is_summarized():
+    items = list(range(TABLE_MIN_ROWS + 5))
+    text, table = format_result(items)
+    assert text.startswith(f"{len(items)} items. First {RESULT_TOP_N}: 0, 1, 2")
+    assert f"(and {len(items) - RESULT_TOP_N} more)" in text
+    assert table["value"].tolist() == items
+
+def test_list_at_the_threshold_has_no_table():
+    text, table = format_result(list(range(TABLE_MIN_ROWS)))
+    assert text.startswith(f"{TABLE_MIN_ROWS} items.")
+    assert table is None
+
+def test_short_series_and_dict_go_in_verbatim():
+    series = pd.Series({"John": 75.0, "Jane": 100.0})
+    assert format_result(series) == (series.to_string(), None)
+    assert format_result({"John": 75.0, "Jane": 100.0}) == (series.to_string(), None)
+
+def test_long_series_gets_stats_and_a_table():
+    series = pd.Series(range(TABLE_MIN_ROWS + 1), name="Present_Count")
+    series.index.name = "Present_Count"
+    text, table = format_result(series)
+    assert text.startswith(f"Series of {TABLE_MIN_ROWS + 1} values")
+    assert f"mean 10.00, min 0, max {TABLE_MIN_ROWS}" in text
+    assert f"First {RESULT_TOP_N}:" in text
+    # Index and values share a name: to_frame still works
+    assert isinstance(table, pd.DataFrame)
+    assert len(table) == TABLE_MIN_ROWS + 1
+
+def test_frame_threshold():
+    small = pd.DataFrame({"roll_number": range(TABLE_MIN_ROWS), "status": ["P", "A"] * (TABLE_MIN_ROWS // 2)})
+    text, table = format_result(small)
+    assert table is None
+    assert text.startswith(f"Table with {TABLE_MIN_ROWS} rows and 2 columns")
+    assert "roll_number: mean" in text
+    assert "status: P x10, A x10" in text
+    assert f"First {TABLE_PREVIEW_ROWS} rows:" in text
+
+    large = pd.DataFrame({"roll_number": range(TABLE_MIN_ROWS + 1)})
+    text, table = format_result(large)
+    assert table is large
+
+def test_tiny_frame_goes_in_verbatim():
+    df = pd.DataFrame({"name": ["John"], "Attendance %": [75.0]})
+    assert format_result(df) == (df.to_string(), None)
+
+def test_list_cells_do_not_break_the_summary():
+    df = pd.DataFrame({"roll_number": range(TABLE_MIN_ROWS), "dates": [["2024-01-01"]] * TABLE_MIN_ROWS})
+    text, table = format_result(df)
+    assert text.startswith(f"Table with {TABLE_MIN_ROWS} rows and 2 columns")
+    assert "roll_number: mean" in text
+    assert f"First {TABLE_PREVIEW_ROWS} rows:" in text
+    assert table is None
+
+def test_mixed_list_is_summarized():
+    items = [1, "two", None, 4.0, [5]] * 5
+    text, table = format_result(items)
+    assert text.startswith(f"{len(items)} items. First {RESULT_TOP_N}: 1, two, None, 4.0, [5]")
+    assert len(table) == len(items)
+
+def test_unformattable_result_falls_back_to_truncated_text():
+    class Broken:
+        def tolist(self):
+            raise RuntimeError("boom")
+        def __str__(self):
+            return "y" * (RESULT_INLINE_CHARS + 1)
+    text, table = format_result(Broken())
+    assert table is None
+    assert text == "y" * RESULT_INLINE_CHARS + f"... ({RESULT_INLINE_CHARS + 1} characters in total)"
@@ -0,0 +1,124 @@
+# tests/test_journal_service.py
+# Journal idempotency and replay against an in-memory stand-in for Supabase.
+import pytest
+from postgrest.exceptions import APIError
+from Attendence.services import attendance_service, journal_service
+
+DATE = "2026-10-19"
+
+class FakeTable:
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+
+    def upsert(self, rows, **options):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.db.requests += 1
+        if self.db.down:
+            raise ConnectionError("database unreachable")
+        if self.name == "attendance" and any(row["roll_number"] in self.db.bad_rolls for row in self.rows):
+            raise APIError({"message": "violates check constraint", "code": "23514"})
+        self.db.tables.setdefault(self.name, []).extend(self.rows)
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables, self.requests, self.down, self.bad_rolls = {}, 0, False, set()
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+    def rolls(self, table="attendance"):
+        return [row["roll_number"] for row in self.tables.get(table, [])]
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_service, "JOURNAL_PATH", str(tmp_path / "journal.sqlite"))
+    monkeypatch.setattr(journal_service, "_replay_loop", lambda journal: None)
+    monkeypatch.setattr(attendance_service, "invalidate_class_data", lambda class_name: None)
+    journal_service._journal.clear()
+    journal = journal_service._journal()
+    yield journal
+    journal["conn"].close()
+    journal_service._journal.clear()
+
+def _rows(journal, status=None):
+    query = "select roll_number, status, attempts from submissions"
+    if status:
+        query += f" where status = '{status}'"
+    return journal["conn"].execute(query + " order by id").fetchall()
+
+def _make_due(journal):
+    journal["conn"].execute("update submissions set next_attempt = 0")
+
+def test_enqueue_is_idempotent_per_student_and_day(journal):
+    assert journal_service.enqueue_submission("Math", 1, "Ann", DATE)
+    assert not journal_service.enqueue_submission("Math", 1, "Ann", DATE)
+    assert journal_service.enqueue_submission("Math", 1, "Ann", "2026-10-20")
+    assert journal_service.enqueue_submission("Physics", 1, "Ann", DATE)
+    assert journal_service.pending_rolls("Math", DATE) == {1}
+
+def test_replay_sends_batch_in_one_request(journal):
+    for roll in range(1, 6):
+        journal_service.enqueue_submission("Math", roll, f"S{roll}", DATE)
+    db = FakeSupabase()
+    journal_service._replay_batch(journal, db)
+    assert db.rolls() == [1, 2, 3, 4, 5]
+    assert db.requests == 1
+    assert journal_service.get_journal_stats() == {"done": 5}
+    assert journal_service.pending_rolls("Math", DATE) == set()
+
+def test_bad_row_is_isolated_and_only_it_is_charged(journal):
+    for roll in range(1, 11):
+        journal_service.enqueue_submission("Math", roll, f"S{roll}", DATE)
+    db = FakeSupabase()
+    db.bad_rolls = {7}
+    journal_service._replay_batch(journal, db)
+    assert db.rolls() == [1, 2, 3, 4, 5, 6]
+    assert _rows(journal, "pending") == [(7, "pending", 1), (8, "pending", 0), (9, "pending", 0), (10, "pending", 0)]
+
+def test_outage_charges_no_entry_and_backs_off(journal):
+    for roll in range(1, 4):
+        journal_service.enqueue_submission("Math", roll, f"S{roll}", DATE)
+    db = FakeSupabase()
+    db.down = True
+    for _ in range(journal_service.MAX_ATTEMPTS + 2):
+        journal_service._replay_batch(journal, db)
+        _make_due(journal)
+    # One request per pass: an outage is not bisected
+    assert db.requests == journal_service.MAX_ATTEMPTS + 2
+    assert _rows(journal) == [(1, "pending", 0), (2, "pending", 0), (3, "pending", 0)]
+
+    db.down = False
+    journal_service._replay_batch(journal, db)
+    assert db.rolls() == [1, 2, 3]
+    assert journal["outages"] == 0
+
+def test_entry_fails_after_max_attempts_and_can_be_retried(journal):
+    journal_service.enqueue_submission("Math", 1, "Ann", DATE)
+    db = FakeSupabase()
+    db.bad_rolls = {1}
+    for _ in range(journal_service.MAX_ATTEMPTS):
+        journal_service._replay_batch(journal, db)
+        _make_due(journal)
+    assert _rows(journal) == [(1, "failed", journal_service.MAX_ATTEMPTS)]
+
+    assert journal_service.retry_failed(["Physics"]) == 0
+    assert journal_service.retry_failed(["Math"]) == 1
+    assert _rows(journal) == [(1, "pending", 0)]
+
+def test_journaled_lock_is_replayed_before_the_check_in(journal):
+    journal_service.enqueue_submission("Math", 4, "Ann", DATE, lock_name=True)
+    journal_service.enqueue_submission("Math", 5, "Bo", DATE)
+    db = FakeSupabase()
+    journal_service._replay_batch(journal, db)
+    assert db.tables["roll_map"] == [{"class_name": "Math", "roll_number": 4, "name": "Ann"}]
+    assert db.rolls() == [4, 5]
+
+def test_class_filter_scopes_stats_and_entries(journal):
+    journal_service.enqueue_submission("Math", 1, "Ann", DATE)
+    journal_service.enqueue_submission("Physics", 2, "Bo", DATE)
+    assert journal_service.get_journal_stats(["Math"]) == {"pending": 1}
+    assert [e["class_name"] for e in journal_service.get_journal_entries(class_names=["Physics"])] == ["Physics"]
+    assert journal_service.get_journal_stats([]) == {}
@@ -0,0 +1,69 @@
+# tests/test_plan_cache.py
+# Slot lifting in cached chatbot plans: only unambiguous literals become slots.
+import pandas as pd
+import pytest
+from Attendence.services.chatbot_service import build_plan, templatize_question
+
+DF = pd.DataFrame({
+    "roll_number": [1, 2, 3],
+    "name": ["Ann", "Bo", "Cy"],
+    "2024-01-01": ["P", "A", "P"],
+    "2024-01-02": ["P", "P", "A"],
+})
+
+def _run(plan, **params):
+    return eval(plan.code_obj, {"df": DF, "pd": pd, **params})
+
+def test_templatize_abstracts_dates_and_numbers():
+    assert templatize_question("Who was absent on 2024-01-02?") == ("who was absent on {date0}", {"date0": "2024-01-02"})
+    assert templatize_question("Who has less than 75% attendance?") == ("who has less than {num0}% attendance", {"num0": 75})
+
+def test_comparison_operand_is_lifted_and_rebound():
+    plan = build_plan("df[df['2024-01-02'] == 'A']['name'].tolist()", {"date0": "2024-01-02"})
+    assert plan is not None and plan.slots == ["date0"]
+    assert "date0" in plan.source
+    assert _run(plan, date0="2024-01-01") == ["Bo"]
+
+def test_percent_threshold_is_lifted_as_fraction():
+    code = "df[(df.iloc[:, 2:] == 'P').mean(axis=1) < 0.75]['name'].tolist()"
+    plan = build_plan(code, {"num0": 75})
+    assert plan is not None
+    assert "axis=1" in plan.source
+    assert _run(plan, num0=75) == ["Bo", "Cy"]
+    assert _run(plan, num0=40) == []
+
+def test_keyword_argument_is_never_lifted():
+    # "more than 1 day": the 1 only appears as axis=1, so nothing can carry the slot
+    code = "df[(df.iloc[:, 2:] == 'A').sum(axis=1) > 0]['name'].tolist()"
+    assert build_plan(code, {"num0": 1}) is None
+
+def test_ambiguous_value_refuses_plan():
+    code = "df[(df.iloc[:, 2:] == 'A').sum(axis=1) > 1]['name'].tolist()"
+    assert build_plan(code, {"num0": 1}) is None
+
+def test_slot_bound_when_value_appears_once_in_liftable_position():
+    code = "df[(df.iloc[:, 2:] == 'A').sum(axis=1) > 3]['name'].tolist()"
+    plan = build_plan(code, {"num0": 3})
+    assert plan is not None and "axis=1" in plan.source and "2:" in plan.source
+    assert _run(plan, num0=0) == ["Bo", "Cy"]
+
+def test_value_matching_a_slice_bound_too_refuses_plan():
+    code = "df[(df.iloc[:, 2:] == 'A').sum(axis=1) > 2]['name'].tolist()"
+    assert build_plan(code, {"num0": 2}) is None
+
+def test_value_embedded_in_larger_literal_refuses_plan():
+    code = "df[df['name'].str.contains('Ann|Bo')]['roll_number'].tolist()"
+    assert build_plan(code, {"name0": "Ann"}) is None
+
+def test_missing_value_refuses_plan():
+    assert build_plan("len(df)", {"num0": 5}) is None
+
+@pytest.mark.parametrize("code", [
+    "__import__('os').getcwd()",
+    "df.__class__",
+    "open('x').read()",
+    "last_result",
+    "x = 1",
+])
+def test_unsafe_or_non_expression_code_refuses_plan(code):
+    assert build_plan(code, {}) is None